@@ -0,0 +1,100 @@
+import numpy as np
+from .graph import Graph
+from .graphstorage import MatrixStorage
+
+# Power-iteration centralities. MatrixStorage graphs multiply with matr
+# directly; every other backend goes through Graph.Adjacency() and
+# bincount. Scores are indexed by node id and removed ids score 0. start
+# warm-starts the iteration, e.g. with the scores of an earlier run.
+
+
+def pagerank(graph, damping=0.85, personalization=None, tol=1e-8,
+        maxiter=100, start=None):
+    # Rank flows along edges in proportion to their weight. Without a
+    # personalization vector the random jump is uniform over live nodes;
+    # with one (indexed by node id) it follows that distribution, which is
+    # also where nodes without out-edges send their rank.
+    spread, outweight, live = _operator(graph)
+    jump = _distribution(live, personalization, "personalization")
+    scores = _distribution(live, start, "start") if start is not None else jump
+    dangling = live & (outweight == 0)
+    share = np.where(outweight > 0, 1.0 / np.where(outweight > 0, outweight, 1), 0)
+
+    for i in range(maxiter):
+        prev = scores
+        leaked = prev[dangling].sum()
+        scores = damping * (spread(prev * share) + leaked * jump) \
+                + (1 - damping) * jump
+        if np.abs(scores - prev).sum() < tol:
+            return scores
+    raise RuntimeError("pagerank did not converge in %d iterations" % maxiter)
+
+def eigenvector(graph, tol=1e-8, maxiter=1000, start=None):
+    # Principal eigenvector of the weighted in-adjacency, scaled to unit
+    # length: a node scores highly when high scoring nodes point at it.
+    # Iterates x + A'x, which has the same eigenvector but also converges
+    # on bipartite graphs.
+    spread, _, live = _operator(graph)
+    scores = _distribution(live, start, "start") if start is not None \
+            else live / np.sqrt(live.sum() or 1.0)
+
+    for i in range(maxiter):
+        prev = scores
+        scores = prev + spread(prev)
+        norm = np.sqrt(np.dot(scores, scores))
+        if norm == 0:
+            return scores
+        scores /= norm
+        if np.abs(scores - prev).sum() < tol:
+            return scores
+    raise RuntimeError("eigenvector did not converge in %d iterations" % maxiter)
+
+def _operator(graph):
+    # Returns (spread, outweight, live): spread(x)[v] sums w(u, v) * x[u]
+    # over the edges into v and outweight[u] is u's total edge weight
+    if not isinstance(graph, Graph):
+        raise TypeError("A graph must be given.")
+    N = len(graph.storage)
+    live = np.ones(N, dtype=bool)
+    live[list(graph._unset)] = False
+
+    if isinstance(graph.storage, MatrixStorage):
+        matr = graph.storage.matr
+        _weightguard(matr)
+        if graph.directed:
+            spread = lambda x: matr.T.dot(x)
+            outweight = matr.sum(axis=1, dtype=np.float64)
+        else:
+            # Undirected edges only fill the upper triangle
+            loops = np.diagonal(matr).astype(np.float64)
+            spread = lambda x: matr.T.dot(x) + matr.dot(x) - loops * x
+            outweight = matr.sum(axis=0, dtype=np.float64) \
+                    + matr.sum(axis=1, dtype=np.float64) - loops
+        return spread, outweight, live
+
+    indptr, indices, weights = graph.Adjacency()
+    weights = weights.astype(np.float64)
+    _weightguard(weights)
+    rows = np.repeat(np.arange(N), np.diff(indptr))
+    spread = lambda x: np.bincount(indices, weights=weights * x[rows], minlength=N)
+    outweight = np.bincount(rows, weights=weights, minlength=N)
+    return spread, outweight, live
+
+def _distribution(live, values, name):
+    if values is None:
+        values = live.astype(np.float64)
+    else:
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape != live.shape:
+            raise ValueError("%s must have one entry per node id" % name)
+        if (values < 0).any():
+            raise ValueError("%s cannot be negative" % name)
+        values = np.where(live, values, 0)
+    total = values.sum()
+    if total == 0:
+        raise ValueError("%s must have a positive entry" % name)
+    return values / total
+
+def _weightguard(weights):
+    if weights.size > 0 and weights.min() < 0:
+        raise ValueError("Centrality needs non-negative weights")
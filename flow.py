@@ -0,0 +1,130 @@
+import numpy as np
+from collections import deque
+from .graph import Graph
+
+# Maximum flow with Dinic's algorithm. Edge weights are capacities and a
+# weight of 0 means there is no edge; undirected edges carry flow either
+# way. The residual network lives in flat lists built once per graph, so
+# the user's storage is never modified and one FlowNetwork can answer
+# many queries while the graph is unchanged.
+
+
+def maxflow(graph, source, sink):
+    # Returns (value, flows, cut) as described in FlowNetwork.MaxFlow
+    return FlowNetwork(graph).MaxFlow(source, sink)
+
+class FlowNetwork(object):
+    def __init__(self, graph):
+        if not isinstance(graph, Graph):
+            raise TypeError("FlowNetwork must be given a graph.")
+        src, dst, caps = graph.storage.Edges()
+        caps = caps.astype(np.float64)
+        if caps.size > 0 and caps.min() < 0:
+            raise ValueError("Capacities cannot be negative")
+        keep = src != dst
+        src, dst, caps = src[keep], dst[keep], caps[keep]
+
+        # Arc e is edge e and arc e + E its reverse; arcs are then sorted
+        # by tail so each node's arcs are contiguous
+        E = len(src)
+        N = len(graph.storage)
+        tails = np.concatenate((src, dst))
+        heads = np.concatenate((dst, src))
+        back = caps if not graph.directed else np.zeros(E)
+        arccaps = np.concatenate((caps, back))
+        partner = np.concatenate((np.arange(E) + E, np.arange(E)))
+
+        order = np.argsort(tails, kind='stable')
+        position = np.empty(2 * E, dtype=np.int64)
+        position[order] = np.arange(2 * E)
+        start = np.zeros(N + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tails, minlength=N), out=start[1:])
+
+        self.graph = graph
+        self.edges = (src, dst)
+        self.start = start.tolist()
+        self.tails = tails[order].tolist()
+        self.heads = heads[order].tolist()
+        self.rev = position[partner[order]].tolist()
+        self.caps = arccaps[order].tolist()
+        self._forward = position[:E]
+        self.residual = list(self.caps)
+
+    def MaxFlow(self, source, sink):
+        # Returns (value, flows, cut): flows[e] is the net flow along edge
+        # e of self.edges (negative if it runs backwards along an
+        # undirected edge) and cut[nid] is True on the source side of a
+        # minimum cut.
+        s = Graph._NodeId(source)
+        t = Graph._NodeId(sink)
+        self.graph._IdGuard(s)
+        self.graph._IdGuard(t)
+        if s == t:
+            raise ValueError("Source and sink must differ")
+
+        self.residual = residual = list(self.caps)
+        value = 0
+        while True:
+            level = self._Levels(s)
+            if level[t] < 0:
+                break
+            value += self._Blocking(s, t, level)
+
+        caps = np.array(self.caps)[self._forward]
+        flows = caps - np.array(residual)[self._forward]
+        cut = np.array(level) >= 0
+        return value, flows, cut
+
+    def _Levels(self, s):
+        start, heads, residual = self.start, self.heads, self.residual
+        level = [ -1 ] * (len(start) - 1)
+        level[s] = 0
+        queue = deque([ s ])
+        while queue:
+            u = queue.popleft()
+            for a in range(start[u], start[u + 1]):
+                v = heads[a]
+                if level[v] < 0 and residual[a] > 0:
+                    level[v] = level[u] + 1
+                    queue.append(v)
+        return level
+
+    def _Blocking(self, s, t, level):
+        # Augments along shortest paths until none is left, advancing a
+        # per-node arc pointer so each arc is given up at most once
+        start, tails, heads = self.start, self.tails, self.heads
+        rev, residual = self.rev, self.residual
+        ptr = start[:-1]
+        total = 0
+        path = []
+        u = s
+        while True:
+            if u == t:
+                pushed = min(residual[a] for a in path)
+                for a in path:
+                    residual[a] -= pushed
+                    residual[rev[a]] += pushed
+                total += pushed
+                # Resume from the tail of the first saturated arc
+                k = next(i for i, a in enumerate(path) if residual[a] == 0)
+                u = tails[path[k]]
+                del path[k:]
+                continue
+
+            end = start[u + 1]
+            a = ptr[u]
+            while a < end and not (residual[a] > 0 and level[heads[a]] == level[u] + 1):
+                a += 1
+            ptr[u] = a
+            if a < end:
+                path.append(a)
+                u = heads[a]
+                continue
+
+            if u == s:
+                return total
+            # Dead end: nothing useful can pass through u this phase
+            level[u] = -1
+            a = path.pop()
+            u = tails[a]
+            ptr[u] += 1
@@ -1,5 +1,8 @@
 import numpy as np
-from graphstorage import MatrixStorage
+import pickle
+from . import graphfile
+from .graphattr import AttributeColumn
+from .graphstorage import MatrixStorage, _storageTypes
 from abc import ABCMeta, abstractmethod
 
 class GraphInterface(object):
@@ -11,6 +14,9 @@ class GraphInterface(object):
     @abstractmethod
     def AddNode(self): raise NotImplementedError
 
+    @abstractmethod
+    def AddNodes(self, count): raise NotImplementedError
+
     @abstractmethod
     def RemoveNode(self, node): raise NotImplementedError
 
@@ -38,10 +44,12 @@ class GraphInterface(object):
 
 class Graph(GraphInterface):
     def __init__(self, numnodes, directed=False, 
-            storage=MatrixStorage):
+            storage=MatrixStorage, **storageargs):
         self.directed = directed
-        self.storage = storage(numnodes)
+        self.storage = storage(numnodes, **storageargs)
         self.data = [ None for i in range(numnodes) ]
+        self.attributes = {}
+        self.listeners = []
         self._unset = set()
 
     ###### Interface Methods #####
@@ -52,28 +60,51 @@ class Graph(GraphInterface):
         if not isinstance(nodeIndex, int):
             raise TypeError("node id must be an int")
         self._IdGuard(nodeIndex)
-        return _Node(self, nodeIndex)
+        return _Node._Make(self, nodeIndex)
 
     def AddNode(self):
         if len(self._unset) > 0:
             nid = self._unset.pop()
-            self.storage.Zero(nid)
         else:
             nid = len(self.data)
             self.storage.AddNode()
             self.data.append(None)
+            for column in self.attributes.values():
+                column.Append(1)
 
+        self._Notify('OnAddNodes', [ nid ])
         return self.GetNode(nid)
 
+    def AddNodes(self, count):
+        reused = [ self._unset.pop() for i in range(min(count, len(self._unset))) ]
+
+        start = len(self.data)
+        fresh = count - len(reused)
+        if fresh > 0:
+            self.storage.AddNodes(fresh)
+            self.data.extend(None for i in range(fresh))
+            for column in self.attributes.values():
+                column.Append(fresh)
+
+        nids = reused + list(range(start, start + fresh))
+        self._Notify('OnAddNodes', nids)
+        return [ self.GetNode(nid) for nid in nids ]
+
     def RemoveNode(self, node):
         nid = Graph._NodeId(node)
         self._IdGuard(nid)
+        self._Notify('OnRemoveNode', nid)
 
         if nid == len(self.data) - 1:
             self.data.pop()
             self.storage.Remove()
+            for column in self.attributes.values():
+                column.Pop()
         else:
+            self.storage.Zero(nid)
             self.data[nid] = None
+            for column in self.attributes.values():
+                column.Reset(nid)
             self._unset.add(nid)
 
     def GetWeight(self, node1, node2):
@@ -82,7 +113,9 @@ class Graph(GraphInterface):
         self._IdGuard(nid1)
         self._IdGuard(nid2)
 
-        return self.storage.Get(nid1, nid2)
+        if not self.directed and nid1 > nid2:
+            nid1, nid2 = nid2, nid1
+        return self.storage._Get(nid1, nid2)
 
     def SetWeight(self, node1, node2, val):
         nid1 = Graph._NodeId(node1)
@@ -90,7 +123,10 @@ class Graph(GraphInterface):
         self._IdGuard(nid1)
         self._IdGuard(nid2)
 
-        self.storage.Set(nid1, nid2, val)
+        if not self.directed and nid1 > nid2:
+            nid1, nid2 = nid2, nid1
+        self._Notify('OnSetWeight', nid1, nid2, val)
+        self.storage._Set(nid1, nid2, val)
 
     def GetData(self, node):
         nid = Graph._NodeId(node)
@@ -110,6 +146,167 @@ class Graph(GraphInterface):
 
     ###### Custom Methods #####
 
+    def ChildIdArray(self, node):
+        nid = Graph._NodeId(node)
+        self._IdGuard(nid)
+        if not self.directed:
+            return self._UndirectedNeighbors(nid)[0]
+        return self.storage._ChildIdArray(nid)
+
+    def ParentIdArray(self, node):
+        nid = Graph._NodeId(node)
+        self._IdGuard(nid)
+        if not self.directed:
+            return self._UndirectedNeighbors(nid)[0]
+        return self.storage._ParentIdArray(nid)
+
+    def NeighborWeights(self, node):
+        nid = Graph._NodeId(node)
+        self._IdGuard(nid)
+        if not self.directed:
+            return self._UndirectedNeighbors(nid)
+        return self.storage._NeighborWeights(nid)
+
+    def GetWeights(self, src, dst):
+        src, dst = self._PairArrays(*self._IdArrayGuard(src, dst))
+        return self.storage._GetMany(src, dst)
+
+    def SetWeights(self, src, dst, weights):
+        src, dst = self._PairArrays(*self._IdArrayGuard(src, dst))
+        weights = np.broadcast_to(np.asarray(weights), src.shape)
+        if self.listeners:
+            # One edge at a time, so each listener sees the edges before it.
+            # If a listener rejects an edge, the ones already written are
+            # restored so the batch is applied entirely or not at all.
+            written = []
+            try:
+                for nid1, nid2, val in zip(src.tolist(), dst.tolist(), weights.tolist()):
+                    old = self.storage._Get(nid1, nid2)
+                    self._Notify('OnSetWeight', nid1, nid2, val)
+                    self.storage._Set(nid1, nid2, val)
+                    written.append((nid1, nid2, old))
+            except Exception:
+                for nid1, nid2, old in reversed(written):
+                    self._Notify('OnSetWeight', nid1, nid2, old)
+                    self.storage._Set(nid1, nid2, old)
+                raise
+            return
+        self.storage._SetMany(src, dst, weights)
+
+    def Adjacency(self, reverse=False):
+        # Returns (indptr, indices, weights): the neighbors of node i are
+        # indices[indptr[i]:indptr[i+1]]. Undirected edges appear in both
+        # directions; reverse=True lists parents instead of children.
+        src, dst, weights = self.storage.Edges()
+        if not self.directed:
+            loops = src == dst
+            src, dst = np.concatenate((src, dst[~loops])), \
+                    np.concatenate((dst, src[~loops]))
+            weights = np.concatenate((weights, weights[~loops]))
+        if reverse:
+            src, dst = dst, src
+
+        N = len(self.storage)
+        order = np.argsort(src, kind='stable')
+        indptr = np.zeros(N + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=N), out=indptr[1:])
+        return indptr, dst[order].astype(np.int64), weights[order]
+
+    def Unchecked(self, nodes=None):
+        if nodes is not None:
+            self._IdArrayGuard(nodes)
+        return _UncheckedGraph(self)
+
+    def Compact(self):
+        live = np.ones(len(self.data), dtype=bool)
+        live[list(self._unset)] = False
+        keep = np.flatnonzero(live)
+
+        mapping = np.full(len(self.data), -1, dtype=np.int64)
+        mapping[keep] = np.arange(len(keep))
+
+        self.storage.Compact(keep)
+        self.data = [ self.data[nid] for nid in keep.tolist() ]
+        for column in self.attributes.values():
+            column.Take(keep)
+        self._unset = set()
+        self._Notify('OnCompact', mapping)
+        return mapping
+
+    def AddListener(self, listener):
+        self.listeners.append(listener)
+
+    def RemoveListener(self, listener):
+        self.listeners.remove(listener)
+
+    def AddAttribute(self, name, dtype, default=0):
+        if name in self.attributes:
+            raise KeyError("Attribute already exists: %s" % name)
+        column = AttributeColumn(len(self.data), dtype, default)
+        self.attributes[name] = column
+
+    def RemoveAttribute(self, name):
+        self._Attribute(name)
+        del self.attributes[name]
+
+    def GetAttribute(self, name, nodes):
+        column = self._Attribute(name)
+        ids, = self._IdArrayGuard(nodes)
+        return column.values[ids]
+
+    def SetAttribute(self, name, nodes, vals):
+        column = self._Attribute(name)
+        ids, = self._IdArrayGuard(nodes)
+        column.values[ids] = vals
+
+    def AttributeArray(self, name):
+        # Indexed by node id; removed ids hold the default value
+        return self._Attribute(name).values
+
+    def ConvertStorage(self, storageClass, **storageargs):
+        self.storage = self.storage.ConvertTo(storageClass, **storageargs)
+
+    def Save(self, path):
+        # Node data can hold arbitrary objects, so it is written with
+        # pickle. See the warning in Load.
+        header = {
+            'storage': type(self.storage).__name__,
+            'N': len(self.storage),
+            'directed': bool(self.directed),
+            'attributes': dict((name, column.default.item())
+                for name, column in self.attributes.items()),
+        }
+        arrays = dict(('storage.' + name, arr)
+                for name, arr in self.storage._Export().items())
+        for name, column in self.attributes.items():
+            arrays['attr.' + name] = column.values
+        arrays['unset'] = np.array(sorted(self._unset), dtype=np.int64)
+        blob = pickle.dumps(self.data, 2)
+        graphfile.WriteContainer(path, header, arrays, blob)
+
+    @staticmethod
+    def Load(path, mmap=True):
+        # WARNING: node data is read back with pickle, and unpickling can
+        # run arbitrary code. Only load files from a trusted source.
+        header, arrays, blob = graphfile.ReadContainer(path, mmap)
+
+        name = header['storage']
+        if name not in _storageTypes:
+            raise IOError("Unknown storage type: %s" % name)
+        prefix = 'storage.'
+        storagearrays = dict((key[len(prefix):], arr)
+                for key, arr in arrays.items() if key.startswith(prefix))
+
+        graph = Graph(0, header['directed'])
+        graph.storage = _storageTypes[name]._Import(header['N'], storagearrays)
+        graph.data = pickle.loads(blob)
+        graph._unset = set(arrays['unset'].tolist())
+        for name, default in header.get('attributes', {}).items():
+            values = arrays['attr.' + name]
+            graph.attributes[name] = AttributeColumn(len(values),
+                    values.dtype, default, values)
+        return graph
+
     @staticmethod
     def _NodeId(node):
         if node is None:
@@ -124,16 +321,158 @@ class Graph(GraphInterface):
         if nid not in self.storage or nid in self._unset:
             raise KeyError("Invalid node id: %s" % nid)
 
+    def _Notify(self, event, *args):
+        for listener in self.listeners:
+            getattr(listener, event)(*args)
+
+    def _Attribute(self, name):
+        if name not in self.attributes:
+            raise KeyError("Unknown attribute: %s" % name)
+        return self.attributes[name]
+
+    def _PairArrays(self, src, dst):
+        if len(src) != len(dst):
+            raise ValueError("src and dst must have the same length")
+        # Undirected edges are stored once, from the lower id to the higher
+        if self.directed:
+            return src, dst
+        return np.minimum(src, dst), np.maximum(src, dst)
+
+    def _ChildIds(self, nid):
+        if not self.directed:
+            return self._UndirectedNeighbors(nid)[0].tolist()
+        return self.storage.Children(nid)
+
+    def _ParentIds(self, nid):
+        if not self.directed:
+            return self._UndirectedNeighbors(nid)[0].tolist()
+        return self.storage.Parents(nid)
+
+    def _UndirectedNeighbors(self, nid):
+        # Neighbors with a higher id are stored in nid's row and neighbors
+        # with a lower id in its column; a self loop appears in both.
+        ids, weights = self.storage._NeighborWeights(nid)
+        lower = self.storage._ParentIdArray(nid)
+        lower = lower[lower != nid]
+        lowerweights = self.storage._GetMany(lower, np.full(len(lower), nid))
+        return np.concatenate((lower, ids)), np.concatenate((lowerweights, weights))
+
+    def _IdArrayGuard(self, *arrays):
+        result = []
+        for ids in arrays:
+            ids = np.asarray(ids)
+            if ids.size > 0 and ids.dtype.kind not in 'iu':
+                raise TypeError("Node ids must be integers: %s" % ids.dtype)
+            ids = ids.astype(np.int64).ravel()
+
+            bad = (ids < 0) | (ids >= len(self.storage))
+            if len(self._unset) > 0:
+                bad |= np.isin(ids, list(self._unset))
+            if bad.any():
+                raise KeyError("Invalid node id: %s" % ids[bad][0])
+            result.append(ids)
+        return result
+
+
+
+
+class GraphListener(object):
+    # Base for objects registered with Graph.AddListener. Edge and removal
+    # events arrive before the change is applied, so raising rejects it;
+    # node additions and Compact are reported afterwards. Edges of an
+    # undirected graph are reported from the lower id to the higher.
+
+    def OnSetWeight(self, nid1, nid2, val): pass
+
+    def OnAddNodes(self, nids): pass
+
+    def OnRemoveNode(self, nid): pass
+
+    def OnCompact(self, mapping): pass
+
+
+
+
+class _UncheckedGraph(object):
+    # Graph operations that skip id validation, for inner loops over ids
+    # that were checked up front (see Graph.Unchecked). Ids must be
+    # Python or NumPy ints of live nodes; anything else is not detected
+    # and may read or overwrite unrelated edges. Writes through this view
+    # are not reported to the graph's listeners.
+
+    __slots__ = ('graph',)
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def GetWeight(self, nid1, nid2):
+        if not self.graph.directed and nid1 > nid2:
+            nid1, nid2 = nid2, nid1
+        return self.graph.storage._Get(nid1, nid2)
+
+    def SetWeight(self, nid1, nid2, val):
+        if not self.graph.directed and nid1 > nid2:
+            nid1, nid2 = nid2, nid1
+        self.graph.storage._Set(nid1, nid2, val)
+
+    def GetWeights(self, src, dst):
+        src, dst = self._Arrays(src, dst)
+        return self.graph.storage._GetMany(src, dst)
+
+    def SetWeights(self, src, dst, weights):
+        src, dst = self._Arrays(src, dst)
+        weights = np.broadcast_to(np.asarray(weights), src.shape)
+        self.graph.storage._SetMany(src, dst, weights)
+
+    def ChildIdArray(self, nid):
+        if not self.graph.directed:
+            return self.graph._UndirectedNeighbors(nid)[0]
+        return self.graph.storage._ChildIdArray(nid)
+
+    def ParentIdArray(self, nid):
+        if not self.graph.directed:
+            return self.graph._UndirectedNeighbors(nid)[0]
+        return self.graph.storage._ParentIdArray(nid)
+
+    def NeighborWeights(self, nid):
+        if not self.graph.directed:
+            return self.graph._UndirectedNeighbors(nid)
+        return self.graph.storage._NeighborWeights(nid)
+
+    def ChildIds(self, nid):
+        return self.ChildIdArray(nid).tolist()
+
+    def _Arrays(self, src, dst):
+        src = np.asarray(src, dtype=np.int64).ravel()
+        dst = np.asarray(dst, dtype=np.int64).ravel()
+        return self.graph._PairArrays(src, dst)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
 
 
 
 class _Node(object):
+    __slots__ = ('graph', 'nid')
+
     def __init__(self, graph, nid):
         if not isinstance(graph, GraphInterface):
-            raise TypeError("Invalid graph: " % graph)
+            raise TypeError("Invalid graph: %s" % graph)
         self.graph = graph
         self.nid = nid
 
+    @staticmethod
+    def _Make(graph, nid):
+        # For ids the graph has already validated
+        node = _Node.__new__(_Node)
+        node.graph = graph
+        node.nid = nid
+        return node
+
     def Connect(self, node, weight):
         return self.graph.SetWeight(self.nid, node, weight)
 
@@ -142,24 +481,33 @@ class _Node(object):
 
     def Children(self):
         self.graph._IdGuard(self.nid)
-        ids = self.graph.storage.Children(self.nid)
-        return [ self.graph[nid] for nid in ids ]
+        ids = self.graph._ChildIds(self.nid)
+        return [ _Node._Make(self.graph, nid) for nid in ids ]
 
     def ChildIds(self):
         self.graph._IdGuard(self.nid)
-        ids = self.graph.storage.Children(self.nid)
+        ids = self.graph._ChildIds(self.nid)
         return list(ids)
 
     def Parents(self):
         self.graph._IdGuard(self.nid)
-        ids = self.graph.storage.Parents(self.nid)
-        return [ self.graph[nid] for nid in ids ]
+        ids = self.graph._ParentIds(self.nid)
+        return [ _Node._Make(self.graph, nid) for nid in ids ]
 
     def ParentIds(self):
         self.graph._IdGuard(self.nid)
-        ids = self.graph.storage.Parents(self.nid)
+        ids = self.graph._ParentIds(self.nid)
         return list(ids)
 
+    def ChildIdArray(self):
+        return self.graph.ChildIdArray(self.nid)
+
+    def ParentIdArray(self):
+        return self.graph.ParentIdArray(self.nid)
+
+    def NeighborWeights(self):
+        return self.graph.NeighborWeights(self.nid)
+
     def Get(self):
         return self.graph.GetData(self.nid)
 
@@ -0,0 +1,73 @@
+import asyncio
+import functools
+from .graph import _Node
+from .graphiter import TraversalIter, bfsarrays, connected_components, \
+        strongly_connected_components, toposort
+
+# Asyncio-friendly traversals and queries (Python 3 only, unlike the rest
+# of the package). The iterators run on the event loop and hand control
+# back every `every` nodes; whole-graph queries run on an executor thread.
+# budget is a time limit in seconds, after which asyncio.TimeoutError is
+# raised. Cancelling an iterator stops it at its next pause; cancelling
+# an offloaded query only stops the wait, the thread finishes its work.
+# The graph must not be modified while any of these are running.
+
+
+def abfsiditer(graph, start, every=256, budget=None):
+    return _cooperative(TraversalIter(graph, start, True), every, budget)
+
+def adfsiditer(graph, start, every=256, budget=None):
+    return _cooperative(TraversalIter(graph, start, False), every, budget)
+
+def abfsiter(startNode, every=256, budget=None):
+    return _nodeiter(startNode, True, every, budget)
+
+def adfsiter(startNode, every=256, budget=None):
+    return _nodeiter(startNode, False, every, budget)
+
+async def offload(func, *args, budget=None, executor=None, **kwargs):
+    # Runs func(*args, **kwargs) on executor (the loop's default thread
+    # pool if None) and waits at most budget seconds for the result
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    return await asyncio.wait_for(loop.run_in_executor(executor, call), budget)
+
+async def abfsarrays(graph, sources, maxdepth=None, budget=None, executor=None):
+    return await offload(bfsarrays, graph, sources, maxdepth,
+            budget=budget, executor=executor)
+
+async def aconnected_components(graph, budget=None, executor=None):
+    return await offload(connected_components, graph,
+            budget=budget, executor=executor)
+
+async def astrongly_connected_components(graph, budget=None, executor=None):
+    return await offload(strongly_connected_components, graph,
+            budget=budget, executor=executor)
+
+async def atoposort(graph, budget=None, executor=None):
+    return await offload(toposort, graph, budget=budget, executor=executor)
+
+def _nodeiter(startNode, bfs, every, budget):
+    if not isinstance(startNode, _Node):
+        raise TypeError("abfsiter must be given a starting node.")
+    graph = startNode.graph
+    ids = TraversalIter(graph, startNode.nid, bfs)
+    return _cooperative((_Node._Make(graph, nid) for nid in ids), every, budget)
+
+def _cooperative(items, every, budget):
+    # Checked here so a bad argument raises at the call, not on first use
+    if every < 1:
+        raise ValueError("every must be positive: %s" % every)
+    return _pausing(items, every, budget)
+
+async def _pausing(items, every, budget):
+    loop = asyncio.get_running_loop()
+    deadline = None if budget is None else loop.time() + budget
+    count = 0
+    for item in items:
+        yield item
+        count += 1
+        if count % every == 0:
+            if deadline is not None and loop.time() > deadline:
+                raise asyncio.TimeoutError("Traversal ran past its budget")
+            await asyncio.sleep(0)
@@ -0,0 +1,45 @@
+import numpy as np
+
+
+class AttributeColumn(object):
+    # One typed value per node id. self.values is a view of the first N
+    # entries of a buffer that grows geometrically, like MatrixStorage.
+
+    _shrinkRatio = 4
+
+    def __init__(self, N, dtype, default=0, values=None):
+        if not isinstance(N, int):
+            raise TypeError("Invalid N: %s" % N)
+        self.dtype = np.dtype(dtype)
+        self.default = self.dtype.type(default)
+
+        if values is None:
+            values = np.full(N, self.default, dtype=self.dtype)
+        elif len(values) != N or values.dtype != self.dtype:
+            raise ValueError("values must hold %s entries of %s" % (N, self.dtype))
+        self._buf = self.values = values
+        self.N = N
+
+    def Append(self, k):
+        newN = self.N + k
+        if newN > len(self._buf):
+            buf = np.empty(max(newN, 2 * len(self._buf)), dtype=self.dtype)
+            buf[:self.N] = self.values
+            self._buf = buf
+        self._buf[self.N:newN] = self.default
+
+        self.N = newN
+        self.values = self._buf[:newN]
+
+    def Pop(self):
+        self.N -= 1
+        if self.N < len(self._buf) // self._shrinkRatio:
+            self._buf = self._buf[:2 * self.N].copy()
+        self.values = self._buf[:self.N]
+
+    def Reset(self, nid):
+        self.values[nid] = self.default
+
+    def Take(self, keep):
+        self._buf = self.values = self.values[keep]
+        self.N = len(keep)
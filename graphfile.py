@@ -0,0 +1,119 @@
+import os
+import json
+import struct
+import tempfile
+import numpy as np
+
+# A graph file is a small container:
+#
+#   magic (8 bytes) | header length (uint64) | JSON header | arrays | blob
+#
+# The header lists each array's name, dtype, shape and byte offset, plus
+# the offset and length of a trailing opaque blob. Arrays start on
+# _alignment byte boundaries so they can be memory-mapped in place.
+
+_magic = b'PYGRAPH1'
+_prefix = struct.Struct('<8sQ')
+_alignment = 64
+
+# os.replace is Python 3 only; rename also replaces on POSIX
+_Replace = getattr(os, 'replace', os.rename)
+
+
+def WriteContainer(path, header, arrays, blob=b''):
+    specs = []
+    offset = 0
+    for name in sorted(arrays):
+        arr = arrays[name]
+        if arr.dtype.hasobject:
+            raise TypeError("Cannot write object array: %s" % name)
+        offset = _Align(offset)
+        specs.append({ 'name': name, 'dtype': arr.dtype.str,
+            'shape': list(arr.shape), 'offset': offset })
+        offset += arr.nbytes
+
+    header = dict(header)
+    header['arrays'] = specs
+    header['blob'] = { 'offset': _Align(offset), 'length': len(blob) }
+
+    # Offsets in the header are relative to the end of the header, so its
+    # own length does not depend on them.
+    encoded = json.dumps(header, sort_keys=True).encode('utf-8')
+    start = _Align(_prefix.size + len(encoded))
+
+    # Arrays may be mapped from path itself (see Graph.Load), so write a
+    # new file next to it and swap it in rather than truncating path
+    fd, tmppath = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_prefix.pack(_magic, len(encoded)))
+            f.write(encoded)
+            for spec in specs:
+                _Pad(f, start + spec['offset'])
+                _WriteArray(f, arrays[spec['name']])
+            _Pad(f, start + header['blob']['offset'])
+            f.write(blob)
+        # mkstemp creates the file private; give it the usual permissions
+        mask = os.umask(0)
+        os.umask(mask)
+        os.chmod(tmppath, 0o666 & ~mask)
+        _Replace(tmppath, path)
+    except:
+        os.remove(tmppath)
+        raise
+
+
+def ReadContainer(path, mmap=True):
+    with open(path, 'rb') as f:
+        prefix = f.read(_prefix.size)
+        if len(prefix) != _prefix.size:
+            raise IOError("Not a graph file: %s" % path)
+        magic, length = _prefix.unpack(prefix)
+        if magic != _magic:
+            raise IOError("Not a graph file: %s" % path)
+        header = json.loads(f.read(length).decode('utf-8'))
+
+        start = _Align(_prefix.size + length)
+        blob = header['blob']
+        f.seek(start + blob['offset'])
+        blobdata = f.read(blob['length'])
+
+        arrays = {}
+        for spec in header['arrays']:
+            arrays[spec['name']] = _ReadArray(f, path, start, spec, mmap)
+
+    return header, arrays, blobdata
+
+
+def _ReadArray(f, path, start, spec, mmap):
+    dtype = np.dtype(str(spec['dtype']))
+    shape = tuple(spec['shape'])
+    count = int(np.prod(shape))
+    offset = start + spec['offset']
+
+    if count == 0:
+        return np.zeros(shape, dtype=dtype)
+    if mmap:
+        # Copy-on-write: the graph can still be modified in memory
+        return np.memmap(path, dtype=dtype, mode='c', offset=offset, shape=shape)
+
+    f.seek(offset)
+    return np.fromfile(f, dtype=dtype, count=count).reshape(shape)
+
+
+def _WriteArray(f, arr):
+    if arr.flags.c_contiguous:
+        arr.tofile(f)
+        return
+    # Write views (e.g. MatrixStorage.matr) a block of rows at a time
+    step = max(1, (1 << 24) // max(1, arr[:1].nbytes))
+    for i in range(0, arr.shape[0], step):
+        f.write(np.ascontiguousarray(arr[i:i + step]).tobytes())
+
+
+def _Pad(f, offset):
+    f.write(b'\0' * (offset - f.tell()))
+
+
+def _Align(offset):
+    return (offset + _alignment - 1) // _alignment * _alignment
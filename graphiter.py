@@ -1,4 +1,6 @@
-from .graph import _Node
+import numpy as np
+from . import graphfile
+from .graph import Graph, _Node
 from collections import deque
 
 
@@ -8,33 +10,303 @@ def bfsiter(startNode):
 def dfsiter(startNode):
     return _generaliter(startNode, False)
 
+def bfsiditer(graph, start):
+    return _generaliditer(graph, start, True)
+
+def dfsiditer(graph, start):
+    return _generaliditer(graph, start, False)
+
+def bfsarrays(graph, sources, maxdepth=None):
+    # Level-synchronous BFS from one or more source ids. Returns (dist,
+    # pred) indexed by node id: dist is the number of hops from the
+    # nearest source (-1 if unreached) and pred the node it was reached
+    # from (-1 for sources and unreached nodes).
+    if not isinstance(graph, Graph):
+        raise TypeError("bfsarrays must be given a graph.")
+    sources, = graph._IdArrayGuard(sources)
+    indptr, indices, _ = graph.Adjacency()
+    return _levelbfs(indptr, indices, sources, maxdepth)
+
+def connected_components(graph):
+    # Labels every node id with its component number, counted from 0 in
+    # order of each component's smallest id. Edge direction is ignored, so
+    # directed graphs get weakly connected components. Removed ids get -1.
+    if not isinstance(graph, Graph):
+        raise TypeError("connected_components must be given a graph.")
+    src, dst, _ = graph.storage.Edges()
+
+    # Hook every root onto the smallest root it shares an edge with, then
+    # jump pointers until each id points at its root. Parents only ever
+    # point to lower ids, so each component ends up rooted at its
+    # smallest id.
+    N = len(graph.storage)
+    parent = np.arange(N)
+    while True:
+        ps, pd = parent[src], parent[dst]
+        differ = ps != pd
+        if not differ.any():
+            break
+        src, dst = src[differ], dst[differ]
+        ps, pd = ps[differ], pd[differ]
+        np.minimum.at(parent, np.maximum(ps, pd), np.minimum(ps, pd))
+        while True:
+            grand = parent[parent]
+            if (grand == parent).all():
+                break
+            parent = grand
+
+    labels = np.full(N, -1, dtype=np.int64)
+    live = np.array(_liveids(graph), dtype=np.int64)
+    _, labels[live] = np.unique(parent[live], return_inverse=True)
+    return labels
+
+def strongly_connected_components(graph):
+    # Iterative Tarjan. Labels every node id with its strongly connected
+    # component; components are numbered in reverse topological order, so
+    # every edge between two components goes from a higher label to a
+    # lower one. Removed ids get -1.
+    if not isinstance(graph, Graph):
+        raise TypeError("strongly_connected_components must be given a graph.")
+    indptr, indices, _ = graph.Adjacency()
+    indptr, indices = indptr.tolist(), indices.tolist()
+
+    N = len(indptr) - 1
+    index = [ -1 ] * N
+    low = [ 0 ] * N
+    onstack = [ False ] * N
+    labels = [ -1 ] * N
+    stack = []
+    counter = count = 0
+
+    for root in _liveids(graph):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        onstack[root] = True
+        work = [ [ root, indptr[root] ] ]
+
+        while work:
+            frame = work[-1]
+            v, pos = frame
+            if pos < indptr[v + 1]:
+                frame[1] = pos + 1
+                w = indices[pos]
+                if index[w] < 0:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    onstack[w] = True
+                    work.append([ w, indptr[w] ])
+                elif onstack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+                continue
+
+            work.pop()
+            if work and low[v] < low[work[-1][0]]:
+                low[work[-1][0]] = low[v]
+            if low[v] == index[v]:
+                while True:
+                    w = stack.pop()
+                    onstack[w] = False
+                    labels[w] = count
+                    if w == v:
+                        break
+                count += 1
+
+    return np.array(labels, dtype=np.int64)
+
+def toposort(graph):
+    # Returns the live node ids of a directed graph in topological order,
+    # level by level and by id within a level. Raises ValueError if the
+    # graph has a cycle.
+    if not isinstance(graph, Graph):
+        raise TypeError("toposort must be given a graph.")
+    if not graph.directed:
+        raise ValueError("Topological order needs a directed graph")
+    indptr, indices, _ = graph.Adjacency()
+
+    N = len(indptr) - 1
+    indegree = np.bincount(indices, minlength=N)
+    live = np.array(_liveids(graph), dtype=np.int64)
+    frontier = live[indegree[live] == 0]
+    levels = []
+    while len(frontier) > 0:
+        levels.append(frontier)
+        _, nbrs = _expand(indptr, indices, frontier)
+        indegree -= np.bincount(nbrs, minlength=N)
+        nbrs = np.unique(nbrs)
+        frontier = nbrs[indegree[nbrs] == 0]
+
+    order = np.concatenate(levels) if levels else live[:0]
+    if len(order) < len(live):
+        raise ValueError("Graph has a cycle")
+    return order
+
+def _liveids(graph):
+    return [ nid for nid in range(len(graph.storage)) if nid not in graph._unset ]
+
+def _mergeadjacency(indptr, indices, rptr, rindices):
+    # Concatenates the rows of two adjacencies over the same nodes
+    N = len(indptr) - 1
+    counts = np.diff(indptr) + np.diff(rptr)
+    merged = np.zeros(N + 1, dtype=np.int64)
+    np.cumsum(counts, out=merged[1:])
+    rows = np.concatenate((np.repeat(np.arange(N), np.diff(indptr)),
+            np.repeat(np.arange(N), np.diff(rptr))))
+    order = np.argsort(rows, kind='stable')
+    return merged, np.concatenate((indices, rindices))[order]
+
+class TraversalIter(object):
+    # The same id order as bfsiditer/dfsiditer, but as an object whose
+    # progress can be exported with State() (or Save) and picked up later
+    # with Restore (or Load), on the same graph or a saved copy of it.
+
+    def __init__(self, graph, start, bfs=True):
+        if not isinstance(graph, Graph):
+            raise TypeError("TraversalIter must be given a graph.")
+        nid = Graph._NodeId(start)
+        graph._IdGuard(nid)
+        self.graph = graph
+        self.bfs = bfs
+        self.count = 0
+        self.visited = bytearray(len(graph.storage))
+        self.frontier = deque([ nid ])
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        visited, frontier = self.visited, self.frontier
+        get = frontier.popleft if self.bfs else frontier.pop
+        while frontier:
+            nid = get()
+            if nid >= len(visited):
+                visited.extend(bytearray(nid + 1 - len(visited)))
+            if visited[nid]:
+                continue
+
+            visited[nid] = 1
+            self.count += 1
+            for cid in self.graph._ChildIds(nid):
+                if cid >= len(visited) or not visited[cid]:
+                    frontier.append(cid)
+            return nid
+        raise StopIteration
+
+    next = __next__
+
+    def State(self):
+        # visited is packed to one bit per node id
+        visited = np.frombuffer(bytes(self.visited), dtype=np.uint8)
+        return {
+            'bfs': np.array([ self.bfs ]),
+            'count': np.array([ self.count ], dtype=np.int64),
+            'size': np.array([ len(visited) ], dtype=np.int64),
+            'visited': np.packbits(visited),
+            'frontier': np.fromiter(self.frontier, dtype=np.int64,
+                count=len(self.frontier)),
+        }
+
+    @staticmethod
+    def Restore(graph, state):
+        if not isinstance(graph, Graph):
+            raise TypeError("TraversalIter must be given a graph.")
+        frontier, = graph._IdArrayGuard(state['frontier'])
+        size = int(state['size'][0])
+        if size > len(graph.storage):
+            raise ValueError("State is for a graph with %d nodes" % size)
+
+        visited = np.unpackbits(np.asarray(state['visited']))[:size]
+        it = TraversalIter.__new__(TraversalIter)
+        it.graph = graph
+        it.bfs = bool(state['bfs'][0])
+        it.count = int(state['count'][0])
+        it.visited = bytearray(visited.tobytes())
+        it.frontier = deque(frontier.tolist())
+        return it
+
+    def Save(self, path):
+        graphfile.WriteContainer(path, { 'kind': 'traversal' }, self.State())
+
+    @staticmethod
+    def Load(graph, path):
+        header, arrays, _ = graphfile.ReadContainer(path, mmap=False)
+        if header.get('kind') != 'traversal':
+            raise IOError("Not a traversal state file: %s" % path)
+        return TraversalIter.Restore(graph, arrays)
+
 def _generaliter(startNode, isbfs):
     if not isinstance(startNode, _Node):
         raise TypeError("bfsiter must be given a starting node.")
     getfunc = deque.popleft if isbfs else deque.pop
     return _doiter(startNode, getfunc)
 
+def _generaliditer(graph, start, isbfs):
+    if not isinstance(graph, Graph):
+        raise TypeError("bfsiditer must be given a graph.")
+    nid = Graph._NodeId(start)
+    graph._IdGuard(nid)
+    getfunc = deque.popleft if isbfs else deque.pop
+    return _doiditer(graph, nid, getfunc)
+
 def _doiter(startNode, getfunc):
     if not isinstance(startNode, _Node):
         raise TypeError("bfsiter must be given a starting node.")
 
+    graph = startNode.graph
+    for nid in _doiditer(graph, startNode.nid, getfunc):
+        yield _Node._Make(graph, nid)
+
+def _doiditer(graph, startId, getfunc):
     visited = set()
     frontier = deque()
-    frontier.append(startNode)
+    frontier.append(startId)
 
     while True:
         if len(frontier) <= 0:
             break
 
-        node = getfunc(frontier)
-        if node.nid in visited:
+        nid = getfunc(frontier)
+        if nid in visited:
             continue
 
-        visited.add(node.nid)
-        yield node
+        visited.add(nid)
+        yield nid
+
+        for cid in graph._ChildIds(nid):
+            if cid not in visited:
+                frontier.append(cid)
+
+def _levelbfs(indptr, indices, sources, maxdepth=None):
+    N = len(indptr) - 1
+    dist = np.full(N, -1, dtype=np.int64)
+    pred = np.full(N, -1, dtype=np.int64)
+
+    frontier = np.unique(sources)
+    dist[frontier] = 0
+    depth = 0
+
+    while len(frontier) > 0 and (maxdepth is None or depth < maxdepth):
+        owners, nbrs = _expand(indptr, indices, frontier)
+        unseen = dist[nbrs] < 0
+        nbrs, first = np.unique(nbrs[unseen], return_index=True)
 
-        for n in node.Children():
-            if n.nid not in visited:
-                frontier.append(n)
+        depth += 1
+        dist[nbrs] = depth
+        pred[nbrs] = owners[unseen][first]
+        frontier = nbrs
 
+    return dist, pred
 
+def _expand(indptr, indices, frontier):
+    # Gathers the neighbors of every frontier node in one pass. Returns
+    # (owners, nbrs) where nbrs[i] is a neighbor of owners[i].
+    starts = indptr[frontier]
+    counts = indptr[frontier + 1] - starts
+    total = int(counts.sum())
+    ends = np.cumsum(counts)
+    offsets = np.arange(total) - np.repeat(ends - counts, counts)
+    nbrs = indices[np.repeat(starts, counts) + offsets]
+    return np.repeat(frontier, counts), nbrs
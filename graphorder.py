@@ -0,0 +1,86 @@
+import numpy as np
+from .graph import Graph, GraphListener
+from .graphiter import toposort
+
+
+class TopoOrder(GraphListener):
+    # Keeps a topological order of a directed graph up to date as edges
+    # are added (Pearce-Kelly). An edge that would close a cycle raises
+    # ValueError from SetWeight/SetWeights and is not stored. Only the
+    # nodes between the edge's endpoints in the current order are visited
+    # and reordered. Edges written through Graph.Unchecked() are not seen.
+
+    def __init__(self, graph):
+        if not isinstance(graph, Graph):
+            raise TypeError("TopoOrder must be given a graph.")
+        order = toposort(graph)
+        self.graph = graph
+        self.pos = [ -1 ] * len(graph.storage)
+        for i, nid in enumerate(order.tolist()):
+            self.pos[nid] = i
+        self._next = len(order)
+        graph.AddListener(self)
+
+    def Order(self):
+        pos = np.array(self.pos, dtype=np.int64)
+        live = np.flatnonzero(pos >= 0)
+        return live[np.argsort(pos[live], kind='stable')]
+
+    def Detach(self):
+        self.graph.RemoveListener(self)
+
+    def OnSetWeight(self, nid1, nid2, val):
+        pos = self.pos
+        if val == 0 or pos[nid1] < pos[nid2]:
+            return
+        if nid1 == nid2:
+            raise ValueError("Edge %d -> %d would create a cycle" % (nid1, nid2))
+
+        lower, upper = pos[nid2], pos[nid1]
+        forward = self._Reach(nid2, self._Children, lambda p: p < upper, nid1)
+        backward = self._Reach(nid1, self._Parents, lambda p: p > lower)
+
+        # Everything that reaches nid1 moves ahead of everything nid2
+        # reaches, reusing the same set of positions
+        key = lambda nid: pos[nid]
+        nodes = sorted(backward, key=key) + sorted(forward, key=key)
+        slots = sorted(pos[nid] for nid in nodes)
+        for nid, slot in zip(nodes, slots):
+            pos[nid] = slot
+
+    def OnAddNodes(self, nids):
+        pos = self.pos
+        for nid in nids:
+            if nid >= len(pos):
+                pos.extend([ -1 ] * (nid + 1 - len(pos)))
+            pos[nid] = self._next
+            self._next += 1
+
+    def OnRemoveNode(self, nid):
+        if nid == len(self.pos) - 1:
+            self.pos.pop()
+        else:
+            self.pos[nid] = -1
+
+    def OnCompact(self, mapping):
+        self.pos = [ self.pos[nid] for nid in np.flatnonzero(mapping >= 0).tolist() ]
+
+    def _Reach(self, start, neighbors, inside, stop=None):
+        pos = self.pos
+        seen = set([ start ])
+        stack = [ start ]
+        while stack:
+            for nid in neighbors(stack.pop()):
+                if nid == stop:
+                    raise ValueError("Edge %d -> %d would create a cycle"
+                            % (stop, start))
+                if nid not in seen and inside(pos[nid]):
+                    seen.add(nid)
+                    stack.append(nid)
+        return seen
+
+    def _Children(self, nid):
+        return self.graph.storage._ChildIdArray(nid).tolist()
+
+    def _Parents(self, nid):
+        return self.graph.storage._ParentIdArray(nid).tolist()
@@ -0,0 +1,55 @@
+import numpy as np
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray
+from .graph import Graph
+from .graphiter import _levelbfs
+
+# Batch traversals spread over a process pool. The graph's adjacency is
+# copied once into shared memory which every worker maps, so only the
+# source ids and the per-source results cross process boundaries.
+
+_shared = None
+
+
+def bfsmany(graph, sources, processes=None, maxdepth=None, reach=False,
+        chunksize=16):
+    # Runs one BFS per source id and yields (source, result) as each one
+    # finishes, in no particular order. result is the hop distance array
+    # (-1 if unreached) or, with reach=True, the sorted ids reached.
+    # Arguments are checked here; the pool starts on the first result.
+    if not isinstance(graph, Graph):
+        raise TypeError("bfsmany must be given a graph.")
+    sources, = graph._IdArrayGuard(sources)
+    indptr, indices, _ = graph.Adjacency()
+    shared = (_share(indptr), _share(indices), len(indptr), len(indices))
+    tasks = [ (nid, maxdepth, reach) for nid in sources.tolist() ]
+    return _stream(shared, tasks, processes, chunksize)
+
+def _stream(shared, tasks, processes, chunksize):
+    pool = multiprocessing.Pool(processes, _attach, shared)
+    try:
+        for result in pool.imap_unordered(_run, tasks, chunksize):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+def _share(arr):
+    # RawArray cannot be empty on every platform, so always keep one slot
+    raw = RawArray('q', max(len(arr), 1))
+    np.frombuffer(raw, dtype=np.int64)[:len(arr)] = arr
+    return raw
+
+def _attach(indptr, indices, nptr, nidx):
+    global _shared
+    _shared = (np.frombuffer(indptr, dtype=np.int64)[:nptr],
+            np.frombuffer(indices, dtype=np.int64)[:nidx])
+
+def _run(task):
+    nid, maxdepth, reach = task
+    indptr, indices = _shared
+    dist, _ = _levelbfs(indptr, indices, np.array([ nid ]), maxdepth)
+    if reach:
+        return nid, np.flatnonzero(dist >= 0)
+    return nid, dist
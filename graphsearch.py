@@ -0,0 +1,224 @@
+import heapq
+import numpy as np
+from .graph import Graph
+from .graphstorage import MatrixStorage
+
+# Weighted shortest paths. Edge weights are read as lengths; a weight of
+# 0 means there is no edge, as with Graph.GetWeight. Every function takes
+# an optional adjacency, the result of graph.Adjacency(), so repeated
+# queries on an unchanged graph can share it.
+
+
+def dijkstra(graph, source, target=None, adjacency=None):
+    # Returns (dist, pred) indexed by node id: dist is the path length
+    # from source (inf if unreachable) and pred the previous node on the
+    # path (-1 for the source and unreachable nodes). With a target, the
+    # search stops once the target's distance is final.
+    src = _nodeid(graph, source)
+    tgt = -1 if target is None else _nodeid(graph, target)
+    indptr, indices, weights = _weighted(graph, adjacency, False)
+
+    N = len(indptr) - 1
+    dist = np.full(N, np.inf)
+    pred = np.full(N, -1, dtype=np.int64)
+    done = np.zeros(N, dtype=bool)
+
+    dist[src] = 0
+    heap = [ (0.0, src) ]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if done[u]:
+            continue
+        done[u] = True
+        if u == tgt:
+            break
+
+        start, end = indptr[u], indptr[u + 1]
+        if start == end:
+            continue
+        nbrs = indices[start:end]
+        nd = d + weights[start:end]
+        better = nd < dist[nbrs]
+        if better.any():
+            nbrs, nd = nbrs[better], nd[better]
+            dist[nbrs] = nd
+            pred[nbrs] = u
+            for v, dv in zip(nbrs.tolist(), nd.tolist()):
+                heapq.heappush(heap, (dv, v))
+
+    return dist, pred
+
+def astar(graph, source, target, heuristic, adjacency=None):
+    # heuristic(nid) must never overestimate the remaining distance to
+    # target. It need not be consistent: a closed node is reopened if a
+    # shorter path to it turns up. Returns (cost, path) with path a list
+    # of ids from source to target, or (inf, []) if it is unreachable.
+    src = _nodeid(graph, source)
+    tgt = _nodeid(graph, target)
+    indptr, indices, weights = _weighted(graph, adjacency, False)
+
+    N = len(indptr) - 1
+    dist = np.full(N, np.inf)
+    pred = np.full(N, -1, dtype=np.int64)
+    done = np.zeros(N, dtype=bool)
+
+    dist[src] = 0
+    heap = [ (heuristic(src), src) ]
+    while heap:
+        _, u = heapq.heappop(heap)
+        if done[u]:
+            continue
+        done[u] = True
+        if u == tgt:
+            return float(dist[tgt]), pathto(pred, tgt)
+
+        start, end = indptr[u], indptr[u + 1]
+        if start == end:
+            continue
+        nbrs = indices[start:end]
+        nd = dist[u] + weights[start:end]
+        better = nd < dist[nbrs]
+        if better.any():
+            nbrs, nd = nbrs[better], nd[better]
+            dist[nbrs] = nd
+            pred[nbrs] = u
+            done[nbrs] = False
+            for v, dv in zip(nbrs.tolist(), nd.tolist()):
+                heapq.heappush(heap, (dv + heuristic(v), v))
+
+    return float('inf'), []
+
+def bidijkstra(graph, source, target, adjacency=None, reverse=None):
+    # Dijkstra from both ends at once: forward over children from source
+    # and backward over parents from target, stopping once the two
+    # frontiers cannot improve on the best meeting point. Returns
+    # (cost, path) like astar. reverse is graph.Adjacency(reverse=True).
+    src = _nodeid(graph, source)
+    tgt = _nodeid(graph, target)
+    sides = (_weighted(graph, adjacency, False), _weighted(graph, reverse, True))
+
+    N = len(sides[0][0]) - 1
+    dist = [ np.full(N, np.inf), np.full(N, np.inf) ]
+    pred = [ np.full(N, -1, dtype=np.int64), np.full(N, -1, dtype=np.int64) ]
+    done = [ np.zeros(N, dtype=bool), np.zeros(N, dtype=bool) ]
+    heaps = [ [ (0.0, src) ], [ (0.0, tgt) ] ]
+    dist[0][src] = 0
+    dist[1][tgt] = 0
+
+    best, meet = (0.0, src) if src == tgt else (np.inf, -1)
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        d, u = heapq.heappop(heaps[side])
+        if done[side][u]:
+            continue
+        done[side][u] = True
+
+        indptr, indices, weights = sides[side]
+        start, end = indptr[u], indptr[u + 1]
+        if start == end:
+            continue
+        nbrs = indices[start:end]
+        nd = d + weights[start:end]
+
+        through = nd + dist[1 - side][nbrs]
+        k = np.argmin(through)
+        if through[k] < best:
+            # If u->meet is not the shortest edge in, an earlier scan
+            # already offered a meeting at least as cheap as this one
+            best, meet = float(through[k]), int(nbrs[k])
+
+        better = nd < dist[side][nbrs]
+        if better.any():
+            nbrs, nd = nbrs[better], nd[better]
+            dist[side][nbrs] = nd
+            pred[side][nbrs] = u
+            for v, dv in zip(nbrs.tolist(), nd.tolist()):
+                heapq.heappush(heaps[side], (dv, v))
+
+    if meet < 0:
+        return float('inf'), []
+    path = pathto(pred[0], meet) + pathto(pred[1], meet)[::-1][1:]
+    return float(best), path
+
+def floydwarshall(graph):
+    # All-pairs shortest paths. Returns (dist, nexthop): dist[i, j] is the
+    # path length from i to j (inf if unreachable) and nexthop[i, j] the
+    # node after i on that path (-1 if unreachable). Negative weights are
+    # allowed, negative cycles raise ValueError. Each round relaxes the
+    # whole matrix through one intermediate node at once.
+    if not isinstance(graph, Graph):
+        raise TypeError("A graph must be given.")
+    dist = _densedistances(graph)
+
+    N = len(dist)
+    idtype = np.int16 if N < 2**15 else np.int32 if N < 2**31 else np.int64
+    nexthop = np.where(np.isinf(dist), -1, np.arange(N, dtype=idtype)).astype(idtype)
+    diag = np.arange(N)
+    nexthop[diag, diag] = diag
+    dist[diag, diag] = np.minimum(dist[diag, diag], 0)
+
+    cand = np.empty_like(dist)
+    better = np.empty(dist.shape, dtype=bool)
+    for k in range(N):
+        col = dist[:, k:k+1].copy()
+        np.add(col, dist[k], out=cand)
+        np.less(cand, dist, out=better)
+        np.copyto(dist, cand, where=better)
+        np.copyto(nexthop, nexthop[:, k:k+1].copy(), where=better)
+
+    if (dist[diag, diag] < 0).any():
+        raise ValueError("Graph has a negative cycle")
+    return dist, nexthop
+
+def hoppath(nexthop, source, target):
+    # Follows a floydwarshall next-hop matrix from source to target
+    if nexthop[source, target] < 0:
+        return []
+    path = [ int(source) ]
+    while path[-1] != target:
+        path.append(int(nexthop[path[-1], target]))
+    return path
+
+def pathto(pred, target):
+    # Follows a predecessor array back from target
+    path = [ int(target) ]
+    while pred[path[-1]] >= 0:
+        path.append(int(pred[path[-1]]))
+    path.reverse()
+    return path
+
+def _densedistances(graph):
+    # Dense float copy of the weights with inf where there is no edge
+    storage = graph.storage
+    if isinstance(storage, MatrixStorage):
+        dist = storage.matr.astype(np.float64)
+        if not graph.directed:
+            lower = np.tril_indices(len(dist), -1)
+            dist[lower] = dist.T[lower]
+    else:
+        indptr, indices, weights = graph.Adjacency()
+        N = len(indptr) - 1
+        dist = np.zeros((N, N))
+        rows = np.repeat(np.arange(N), np.diff(indptr))
+        dist[rows, indices] = weights
+    dist[dist == 0] = np.inf
+    return dist
+
+def _weighted(graph, adjacency, reverse):
+    if adjacency is None:
+        adjacency = graph.Adjacency(reverse=reverse)
+    indptr, indices, weights = adjacency
+    weights = np.asarray(weights, dtype=np.float64)
+    if (weights < 0).any():
+        raise ValueError("Shortest paths need non-negative weights")
+    return indptr, indices, weights
+
+def _nodeid(graph, node):
+    if not isinstance(graph, Graph):
+        raise TypeError("A graph must be given.")
+    nid = Graph._NodeId(node)
+    graph._IdGuard(nid)
+    return nid
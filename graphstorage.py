@@ -1,8 +1,14 @@
+import os
+import struct
 import numpy as np
 from abc import ABCMeta, abstractmethod
 
 
 class StorageBase(object):
+    # A weight of 0 means there is no edge. Backends never report a zero
+    # weight as an edge from their adjacency queries or Edges(), so code
+    # built on Graph.Adjacency() needs no filtering of its own.
+
     __metaclass__ = ABCMeta
 
     def __init__(self, N):
@@ -22,6 +28,21 @@ class StorageBase(object):
     @abstractmethod
     def Remove(self): raise NotImplementedError
 
+    def AddNodes(self, k):
+        self._CountGuard(k)
+        for i in range(k):
+            self.AddNode()
+
+    def GetMany(self, src, dst):
+        src, dst = self._IdArrayGuard(src, dst)
+        return np.array([ self.Get(n1, n2)
+            for n1, n2 in zip(src.tolist(), dst.tolist()) ])
+
+    def SetMany(self, src, dst, vals):
+        src, dst, vals = self._BatchArrays(src, dst, vals)
+        for n1, n2, val in zip(src.tolist(), dst.tolist(), vals.tolist()):
+            self.Set(n1, n2, val)
+
     @abstractmethod
     def Zero(self, nid): raise NotImplementedError
 
@@ -31,9 +52,75 @@ class StorageBase(object):
     @abstractmethod
     def Parents(self, nid): raise NotImplementedError
 
+    def ChildIdArray(self, nid):
+        return np.fromiter(self.Children(nid), dtype=np.int64)
+
+    def ParentIdArray(self, nid):
+        return np.fromiter(self.Parents(nid), dtype=np.int64)
+
+    def NeighborWeights(self, nid):
+        ids = self.ChildIdArray(nid)
+        weights = np.array([ self.Get(nid, cid) for cid in ids.tolist() ])
+        return ids, weights
+
+    def Edges(self):
+        rows = [ self.NeighborWeights(nid) for nid in range(self.N) ]
+        src = np.repeat(np.arange(self.N), [ len(ids) for ids, _ in rows ])
+        if len(rows) == 0:
+            return src, src.copy(), np.zeros(0)
+        dst = np.concatenate([ ids for ids, _ in rows ])
+        weights = np.concatenate([ weights for _, weights in rows ])
+        return src, dst, weights
+
+    def Compact(self, keep):
+        # Generic fallback: clear everything, drop the surplus nodes and
+        # write the surviving edges back under their new ids.
+        keep, = self._IdArrayGuard(keep)
+        mapping = _Renumbering(keep, self.N)
+        src, dst, weights = self.Edges()
+        live = (mapping[src] >= 0) & (mapping[dst] >= 0)
+
+        for nid in range(self.N):
+            self.Zero(nid)
+        for i in range(self.N - len(keep)):
+            self.Remove()
+        self.SetMany(mapping[src[live]], mapping[dst[live]], weights[live])
+
+    def ConvertTo(self, storageClass, **storageargs):
+        src, dst, weights = self.Edges()
+        storage = storageClass(self.N, **storageargs)
+        storage.SetMany(src, dst, weights)
+        return storage
+
     def __len__(self):
         return self.N
 
+    # Unchecked primitives for callers that have already validated their
+    # ids (see Graph.Unchecked). Batch versions take int64 arrays of equal
+    # length. Backends override them to skip their guards; by default
+    # they fall back to the checked methods.
+
+    def _Get(self, n1, n2):
+        return self.Get(n1, n2)
+
+    def _Set(self, n1, n2, val):
+        self.Set(n1, n2, val)
+
+    def _GetMany(self, src, dst):
+        return self.GetMany(src, dst)
+
+    def _SetMany(self, src, dst, vals):
+        self.SetMany(src, dst, vals)
+
+    def _ChildIdArray(self, nid):
+        return self.ChildIdArray(nid)
+
+    def _ParentIdArray(self, nid):
+        return self.ParentIdArray(nid)
+
+    def _NeighborWeights(self, nid):
+        return self.NeighborWeights(nid)
+
     def __getitem__(self, indices):
         start, end = self._ParseIndices(indices)
         return self.Get(start, end)
@@ -57,6 +144,32 @@ class StorageBase(object):
         if nid < 0 or nid >= self.N:
             raise KeyError("Invalid node id: %s" % nid)
 
+    def _IdArrayGuard(self, *arrays):
+        result = []
+        for ids in arrays:
+            ids = np.asarray(ids)
+            if ids.size > 0 and ids.dtype.kind not in 'iu':
+                raise TypeError("Invalid node id type: %s" % ids.dtype)
+            ids = ids.astype(np.int64).ravel()
+            bad = (ids < 0) | (ids >= self.N)
+            if bad.any():
+                raise KeyError("Invalid node id: %s" % ids[bad][0])
+            result.append(ids)
+        return result
+
+    def _BatchArrays(self, src, dst, vals):
+        src, dst = self._IdArrayGuard(src, dst)
+        if len(src) != len(dst):
+            raise ValueError("src and dst must have the same length")
+        vals = np.broadcast_to(np.asarray(vals), src.shape)
+        return src, dst, vals
+
+    def _CountGuard(self, k):
+        if not isinstance(k, int):
+            raise TypeError("Invalid node count type: %s" % type(k))
+        if k < 0:
+            raise ValueError("Invalid node count: %s" % k)
+
     def _ParseIndices(self, indices):
         if isinstance(indices, int):
             raise IndexError("There must be 2 indices given")
@@ -76,29 +189,67 @@ class StorageBase(object):
 
 
 class MatrixStorage(StorageBase):
-    def __init__(self, N):
+    # self.matr is a view of the top-left N x N corner of a larger buffer
+    # that grows geometrically and shrinks once mostly unused. An
+    # undirected Graph only writes the upper triangle, but the full N x N
+    # buffer is still allocated: there is no packed triangular layout.
+
+    _shrinkRatio = 4
+
+    def __init__(self, N, dtype=np.float64):
         super(MatrixStorage, self).__init__(N)
-        self.matr = np.zeros((N, N))
+        self._buf = np.zeros((N, N), dtype=dtype)
+        self.matr = self._buf
 
     def Get(self, n1, n2):
         self._IdGuard(n1, n2)
+        return self._Get(n1, n2)
+
+    def _Get(self, n1, n2):
         return self.matr[n1, n2]
 
     def Set(self, n1, n2, val):
         self._IdGuard(n1, n2)
+        self._Set(n1, n2, val)
+
+    def _Set(self, n1, n2, val):
         self.matr[n1, n2] = val
 
+    def GetMany(self, src, dst):
+        src, dst = self._IdArrayGuard(src, dst)
+        return self._GetMany(src, dst)
+
+    def _GetMany(self, src, dst):
+        return self.matr[src, dst]
+
+    def SetMany(self, src, dst, vals):
+        src, dst, vals = self._BatchArrays(src, dst, vals)
+        self._SetMany(src, dst, vals)
+
+    def _SetMany(self, src, dst, vals):
+        self.matr[src, dst] = vals
+
     def AddNode(self):
-        newN = self.N + 1
-        newMatr = np.zeros((newN, newN))
-        newMatr[:self.N, :self.N] = self.matr
+        self.AddNodes(1)
+
+    def AddNodes(self, k):
+        self._CountGuard(k)
+        newN = self.N + k
+        if newN > self._buf.shape[0]:
+            self._Resize(max(newN, 2 * self._buf.shape[0]))
+        else:
+            # Rows and columns past N may hold stale values from Remove
+            self._buf[self.N:newN, :newN] = 0
+            self._buf[:newN, self.N:newN] = 0
 
         self.N = newN
-        self.matr = newMatr
+        self.matr = self._buf[:newN, :newN]
 
     def Remove(self):
         self.N -= 1
-        self.matr = self.matr[:self.N, :self.N]
+        if self.N < self._buf.shape[0] // self._shrinkRatio:
+            self._Resize(2 * self.N)
+        self.matr = self._buf[:self.N, :self.N]
 
     def Zero(self, nid):
         self._IdGuard(nid)
@@ -106,50 +257,456 @@ class MatrixStorage(StorageBase):
         self.matr[:, nid] = 0
 
     def Children(self, nid):
-        self._IdGuard(nid)
-        return (i for i, x in enumerate(self.matr[nid, :]) if x != 0)
+        return iter(self.ChildIdArray(nid).tolist())
 
     def Parents(self, nid):
+        return iter(self.ParentIdArray(nid).tolist())
+
+    def ChildIdArray(self, nid):
         self._IdGuard(nid)
-        return (i for i, x in enumerate(self.matr[:, nid]) if x != 0)
+        return self._ChildIdArray(nid)
+
+    def _ChildIdArray(self, nid):
+        return np.flatnonzero(self.matr[nid, :])
+
+    def ParentIdArray(self, nid):
+        self._IdGuard(nid)
+        return self._ParentIdArray(nid)
+
+    def _ParentIdArray(self, nid):
+        return np.flatnonzero(self.matr[:, nid])
+
+    def NeighborWeights(self, nid):
+        self._IdGuard(nid)
+        return self._NeighborWeights(nid)
+
+    def _NeighborWeights(self, nid):
+        row = self.matr[nid, :]
+        ids = np.flatnonzero(row)
+        return ids, row[ids]
+
+    def Edges(self):
+        src, dst = np.nonzero(self.matr)
+        return src, dst, self.matr[src, dst]
+
+    def Compact(self, keep):
+        keep, = self._IdArrayGuard(keep)
+        self._buf = self.matr = self.matr[np.ix_(keep, keep)]
+        self.N = len(keep)
 
     def __len__(self):
         assert(self.matr.shape[0] == self.N)
         return self.N
 
+    def _Resize(self, capacity):
+        buf = np.zeros((capacity, capacity), dtype=self._buf.dtype)
+        n = min(self.N, capacity)
+        buf[:n, :n] = self._buf[:n, :n]
+        self._buf = buf
+
+    def _Export(self):
+        return { 'matr': self.matr }
+
+    @classmethod
+    def _Import(cls, N, arrays):
+        # Subclasses such as MemmapMatrixStorage load as a plain matrix
+        storage = MatrixStorage.__new__(MatrixStorage)
+        StorageBase.__init__(storage, N)
+        storage._buf = storage.matr = arrays['matr']
+        return storage
+
+
+
+
+
+class MemmapMatrixStorage(MatrixStorage):
+    # MatrixStorage whose buffer is a memory-mapped file: a _headerSize
+    # byte header (magic, N, capacity, dtype) followed by the capacity x
+    # capacity matrix. Capacity is a multiple of chunk nodes, and the file
+    # is rewritten whenever it changes. With mode 'r' or 'r+' an existing
+    # file is mapped and N must match the node count it holds.
+
+    _magic = b'PYGRAPHM'
+    _headerFormat = '<8sqq40s'
+    _headerSize = struct.calcsize(_headerFormat)
+
+    def __init__(self, N, path, dtype=np.float64, mode='w+', chunk=1024):
+        StorageBase.__init__(self, N)
+        if mode not in ('r', 'r+', 'w+'):
+            raise ValueError("Invalid mode: %s" % mode)
+        if not isinstance(chunk, int) or chunk <= 0:
+            raise ValueError("Invalid chunk size: %s" % chunk)
+
+        self.path = path
+        self.mode = mode
+        self.chunk = chunk
+
+        if mode == 'w+':
+            capacity = self._ChunkCapacity(N)
+            MemmapMatrixStorage._CreateFile(path, N, capacity, np.dtype(dtype))
+        else:
+            fileN, _, _ = MemmapMatrixStorage._ReadHeader(path)
+            if fileN != N:
+                raise ValueError("File holds %s nodes, not %s" % (fileN, N))
+
+        self._Map()
+
+    @staticmethod
+    def Open(path, mode='r', chunk=1024):
+        N, _, _ = MemmapMatrixStorage._ReadHeader(path)
+        return MemmapMatrixStorage(N, path, mode=mode, chunk=chunk)
+
+    def Set(self, n1, n2, val):
+        self._WriteGuard()
+        super(MemmapMatrixStorage, self).Set(n1, n2, val)
+
+    def _Set(self, n1, n2, val):
+        self._WriteGuard()
+        super(MemmapMatrixStorage, self)._Set(n1, n2, val)
+
+    def SetMany(self, src, dst, vals):
+        self._WriteGuard()
+        super(MemmapMatrixStorage, self).SetMany(src, dst, vals)
+
+    def _SetMany(self, src, dst, vals):
+        self._WriteGuard()
+        super(MemmapMatrixStorage, self)._SetMany(src, dst, vals)
+
+    def Zero(self, nid):
+        self._WriteGuard()
+        super(MemmapMatrixStorage, self).Zero(nid)
+
+    def AddNodes(self, k):
+        self._WriteGuard()
+        super(MemmapMatrixStorage, self).AddNodes(k)
+        self._WriteHeader()
+
+    def Remove(self):
+        self._WriteGuard()
+        super(MemmapMatrixStorage, self).Remove()
+        self._WriteHeader()
+
+    def Flush(self):
+        if self.mode != 'r':
+            self._buf.flush()
+            self._header.flush()
+
+    def Compact(self, keep):
+        self._WriteGuard()
+        keep, = self._IdArrayGuard(keep)
+        n = len(keep)
+        self._buf[:n, :n] = self.matr[np.ix_(keep, keep)]
+        self.N = n
+        self.matr = self._buf[:n, :n]
+        self._Resize(n)
+        self._WriteHeader()
+
+    def _ChunkCapacity(self, n):
+        return self.chunk * max(1, (n + self.chunk - 1) // self.chunk)
+
+    def _Resize(self, capacity):
+        capacity = self._ChunkCapacity(capacity)
+        if capacity == self._buf.shape[0]:
+            return
+
+        tmppath = self.path + '.tmp'
+        MemmapMatrixStorage._CreateFile(tmppath, self.N, capacity, self._buf.dtype)
+        buf = np.memmap(tmppath, dtype=self._buf.dtype, mode='r+',
+                offset=self._headerSize, shape=(capacity, capacity))
+        n = min(self.N, capacity)
+        buf[:n, :n] = self._buf[:n, :n]
+        buf.flush()
+
+        del buf
+        self._buf = self.matr = self._header = None
+        os.remove(self.path)
+        os.rename(tmppath, self.path)
+        self._Map()
+
+    def _Map(self):
+        # The file exists by now, so 'w+' must not recreate it
+        mode = 'r' if self.mode == 'r' else 'r+'
+        N, capacity, dtype = MemmapMatrixStorage._ReadHeader(self.path)
+        self._header = np.memmap(self.path, dtype=np.uint8, mode=mode,
+                shape=(self._headerSize,))
+        self._buf = np.memmap(self.path, dtype=dtype, mode=mode,
+                offset=self._headerSize, shape=(capacity, capacity))
+        self.matr = self._buf[:self.N, :self.N]
+
+    def _WriteHeader(self):
+        header = MemmapMatrixStorage._PackHeader(
+                self.N, self._buf.shape[0], self._buf.dtype)
+        self._header[:] = np.frombuffer(header, dtype=np.uint8)
+
+    def _WriteGuard(self):
+        if self.mode == 'r':
+            raise IOError("Storage is read-only: %s" % self.path)
+
+    @staticmethod
+    def _PackHeader(N, capacity, dtype):
+        return struct.pack(MemmapMatrixStorage._headerFormat,
+                MemmapMatrixStorage._magic, N, capacity,
+                dtype.str.encode('ascii'))
+
+    @staticmethod
+    def _ReadHeader(path):
+        with open(path, 'rb') as f:
+            header = f.read(MemmapMatrixStorage._headerSize)
+        if len(header) != MemmapMatrixStorage._headerSize:
+            raise IOError("Not a matrix storage file: %s" % path)
+
+        magic, N, capacity, dtype = struct.unpack(
+                MemmapMatrixStorage._headerFormat, header)
+        if magic != MemmapMatrixStorage._magic:
+            raise IOError("Not a matrix storage file: %s" % path)
+        return N, capacity, np.dtype(dtype.rstrip(b'\0').decode('ascii'))
+
+    @staticmethod
+    def _CreateFile(path, N, capacity, dtype):
+        with open(path, 'wb') as f:
+            f.write(MemmapMatrixStorage._PackHeader(N, capacity, dtype))
+            f.truncate(MemmapMatrixStorage._headerSize
+                    + capacity * capacity * dtype.itemsize)
+
+
+
+
+
+class BitMatrixStorage(StorageBase):
+    # Unweighted adjacency matrix with one bit per possible edge. Row i is
+    # packed big-endian into self.bits[i, :], so edge (i, j) is bit
+    # 0x80 >> (j & 7) of byte j >> 3. Any nonzero value given to Set adds
+    # the edge, and Get returns 1 or 0. Capacity grows as in MatrixStorage.
+
+    _shrinkRatio = 4
+
+    def __init__(self, N):
+        super(BitMatrixStorage, self).__init__(N)
+        self._buf = np.zeros((N, _PackedLength(N)), dtype=np.uint8)
+        self.bits = self._buf
+
+    def Get(self, n1, n2):
+        self._IdGuard(n1, n2)
+        return self._Get(n1, n2)
+
+    def _Get(self, n1, n2):
+        return (int(self.bits[n1, n2 >> 3]) >> (7 - (n2 & 7))) & 1
+
+    def Set(self, n1, n2, val):
+        self._IdGuard(n1, n2)
+        self._Set(n1, n2, val)
+
+    def _Set(self, n1, n2, val):
+        mask = 0x80 >> (n2 & 7)
+        if val != 0:
+            self.bits[n1, n2 >> 3] |= mask
+        else:
+            self.bits[n1, n2 >> 3] &= 0xFF ^ mask
+
+    def GetMany(self, src, dst):
+        src, dst = self._IdArrayGuard(src, dst)
+        return self._GetMany(src, dst)
+
+    def _GetMany(self, src, dst):
+        return (self.bits[src, dst >> 3] >> (7 - (dst & 7))) & 1
+
+    def SetMany(self, src, dst, vals):
+        src, dst, vals = self._BatchArrays(src, dst, vals)
+        self._SetMany(src, dst, vals)
+
+    def _SetMany(self, src, dst, vals):
+        src, dst, vals = _LastWrites(src, dst, vals, self.N)
+        masks = (0x80 >> (dst & 7)).astype(np.uint8)
+        on = vals != 0
+        np.bitwise_or.at(self.bits, (src[on], dst[on] >> 3), masks[on])
+        off = ~on
+        np.bitwise_and.at(self.bits, (src[off], dst[off] >> 3), ~masks[off])
+
+    def AddNode(self):
+        self.AddNodes(1)
+
+    def AddNodes(self, k):
+        self._CountGuard(k)
+        newN = self.N + k
+        if newN > self._buf.shape[0]:
+            self._Resize(max(newN, 2 * self._buf.shape[0]))
+        else:
+            self._buf[self.N:newN, :] = 0
+            for nid in range(self.N, newN):
+                self._ClearColumn(nid, newN)
+
+        self.N = newN
+        self.bits = self._buf[:newN]
+
+    def Remove(self):
+        self.N -= 1
+        if self.N < self._buf.shape[0] // self._shrinkRatio:
+            self._Resize(2 * self.N)
+        self.bits = self._buf[:self.N]
+
+    def Zero(self, nid):
+        self._IdGuard(nid)
+        self.bits[nid, :] = 0
+        self._ClearColumn(nid, self.N)
+
+    def Children(self, nid):
+        return iter(self.ChildIdArray(nid).tolist())
+
+    def Parents(self, nid):
+        return iter(self.ParentIdArray(nid).tolist())
+
+    def ChildIdArray(self, nid):
+        self._IdGuard(nid)
+        return self._ChildIdArray(nid)
+
+    def _ChildIdArray(self, nid):
+        return np.flatnonzero(np.unpackbits(self.bits[nid])[:self.N])
+
+    def ParentIdArray(self, nid):
+        self._IdGuard(nid)
+        return self._ParentIdArray(nid)
+
+    def _ParentIdArray(self, nid):
+        return np.flatnonzero(self.bits[:, nid >> 3] & (0x80 >> (nid & 7)))
+
+    def NeighborWeights(self, nid):
+        self._IdGuard(nid)
+        return self._NeighborWeights(nid)
+
+    def _NeighborWeights(self, nid):
+        ids = self._ChildIdArray(nid)
+        return ids, np.ones(len(ids), dtype=np.uint8)
+
+    def Edges(self):
+        # Unpack a block of rows at a time to bound the temporary memory
+        step = max(1, (1 << 24) // max(1, self.N))
+        srcs, dsts = [], []
+        for start in range(0, self.N, step):
+            block = np.unpackbits(self.bits[start:start + step], axis=1)
+            src, dst = np.nonzero(block[:, :self.N])
+            srcs.append(src + start)
+            dsts.append(dst)
+        if len(srcs) == 0:
+            srcs = dsts = [ np.zeros(0, dtype=np.int64) ]
+        src, dst = np.concatenate(srcs), np.concatenate(dsts)
+        return src, dst, np.ones(len(src), dtype=np.uint8)
+
+    def Compact(self, keep):
+        keep, = self._IdArrayGuard(keep)
+        n = len(keep)
+        buf = np.zeros((n, _PackedLength(n)), dtype=np.uint8)
+        step = max(1, (1 << 24) // max(1, self.N))
+        for start in range(0, n, step):
+            rows = np.unpackbits(self.bits[keep[start:start + step]], axis=1)
+            buf[start:start + step] = np.packbits(rows[:, keep], axis=1)
+        self._buf = self.bits = buf
+        self.N = n
+
+    def __len__(self):
+        assert(self.bits.shape[0] == self.N)
+        return self.N
+
+    def _ClearColumn(self, nid, rows):
+        self._buf[:rows, nid >> 3] &= 0xFF ^ (0x80 >> (nid & 7))
+
+    def _Resize(self, capacity):
+        buf = np.zeros((capacity, _PackedLength(capacity)), dtype=np.uint8)
+        n = min(self.N, capacity)
+        width = _PackedLength(n)
+        buf[:n, :width] = self._buf[:n, :width]
+        # Drop the bits of columns n and beyond that share the last byte
+        if n % 8 != 0:
+            buf[:n, width - 1] &= (0xFF << (8 - n % 8)) & 0xFF
+        self._buf = buf
+
+    def _Export(self):
+        return { 'bits': self.bits }
+
+    @classmethod
+    def _Import(cls, N, arrays):
+        storage = cls.__new__(cls)
+        StorageBase.__init__(storage, N)
+        storage._buf = storage.bits = arrays['bits']
+        return storage
+
 
 
 
 
 class ListStorage(StorageBase):
+    # self.parents[n] holds the ids with an edge into n, so that Parents,
+    # Zero and Remove only touch the edges of the node involved.
+
     def __init__(self, N):
         super(ListStorage, self).__init__(N)
         self.data = [ {} for i in range(N) ]
+        self.parents = [ set() for i in range(N) ]
 
     def Get(self, n1, n2):
         self._IdGuard(n1, n2)
+        return self._Get(n1, n2)
+
+    def _Get(self, n1, n2):
         if n2 not in self.data[n1]:
             return 0
         return self.data[n1][n2]
 
     def Set(self, n1, n2, val):
         self._IdGuard(n1, n2)
-        self.data[n1][n2] = val
+        self._Set(n1, n2, val)
+
+    def _Set(self, n1, n2, val):
+        # A weight of 0 means no edge, so it is never stored
+        if val != 0:
+            self.data[n1][n2] = val
+            self.parents[n2].add(n1)
+        elif self.data[n1].pop(n2, None) is not None:
+            self.parents[n2].discard(n1)
+
+    def GetMany(self, src, dst):
+        src, dst = self._IdArrayGuard(src, dst)
+        return self._GetMany(src, dst)
+
+    def _GetMany(self, src, dst):
+        data = self.data
+        return np.array([ data[n1].get(n2, 0)
+            for n1, n2 in zip(src.tolist(), dst.tolist()) ])
+
+    def SetMany(self, src, dst, vals):
+        src, dst, vals = self._BatchArrays(src, dst, vals)
+        self._SetMany(src, dst, vals)
+
+    def _SetMany(self, src, dst, vals):
+        data, parents = self.data, self.parents
+        for n1, n2, val in zip(src.tolist(), dst.tolist(), vals.tolist()):
+            if val != 0:
+                data[n1][n2] = val
+                parents[n2].add(n1)
+            elif data[n1].pop(n2, None) is not None:
+                parents[n2].discard(n1)
 
     def AddNode(self):
         self.data.append({})
+        self.parents.append(set())
         self.N += 1
         assert(len(self.data) == self.N)
 
+    def AddNodes(self, k):
+        self._CountGuard(k)
+        self.data.extend({} for i in range(k))
+        self.parents.extend(set() for i in range(k))
+        self.N += k
+        assert(len(self.data) == self.N)
+
     def Remove(self):
+        self._Cleanse(self.N - 1)
         self.N -= 1
-        self._Cleanse(self.N)
         self.data.pop()
+        self.parents.pop()
         assert(len(self.data) == self.N)
 
     def Zero(self, nid):
         self._IdGuard(nid)
-        self.data[nid] = {}
         self._Cleanse(nid)
 
     def Children(self, nid):
@@ -158,16 +715,546 @@ class ListStorage(StorageBase):
 
     def Parents(self, nid):
         self._IdGuard(nid)
-        return (index for index, x in enumerate(self.data) if nid in x)
+        return iter(self.parents[nid])
+
+    def ChildIdArray(self, nid):
+        self._IdGuard(nid)
+        return self._ChildIdArray(nid)
+
+    def _ChildIdArray(self, nid):
+        row = self.data[nid]
+        return np.fromiter(row, dtype=np.int64, count=len(row))
+
+    def ParentIdArray(self, nid):
+        self._IdGuard(nid)
+        return self._ParentIdArray(nid)
+
+    def _ParentIdArray(self, nid):
+        col = self.parents[nid]
+        return np.fromiter(col, dtype=np.int64, count=len(col))
+
+    def NeighborWeights(self, nid):
+        self._IdGuard(nid)
+        return self._NeighborWeights(nid)
+
+    def _NeighborWeights(self, nid):
+        row = self.data[nid]
+        ids = np.fromiter(row, dtype=np.int64, count=len(row))
+        weights = np.array(list(row.values()))
+        return ids, weights
+
+    def Edges(self):
+        data = self.data
+        src = np.fromiter((n1 for n1, row in enumerate(data) for n2 in row),
+                dtype=np.int64)
+        dst = np.fromiter((n2 for row in data for n2 in row), dtype=np.int64)
+        weights = np.array([ w for row in data for w in row.values() ])
+        return src, dst, weights
+
+    def Compact(self, keep):
+        keep, = self._IdArrayGuard(keep)
+        mapping = _Renumbering(keep, self.N).tolist()
+        data, parents = self.data, self.parents
+        self.data = [ dict((mapping[n2], w) for n2, w in data[n1].items()
+            if mapping[n2] >= 0) for n1 in keep.tolist() ]
+        self.parents = [ set(mapping[n1] for n1 in parents[n2]
+            if mapping[n1] >= 0) for n2 in keep.tolist() ]
+        self.N = len(keep)
 
     def __len__(self):
         assert(len(self.data) == self.N)
         return self.N
 
     def _Cleanse(self, nid):
-        for i in range(self.N):
-            if nid in self.data[i]:
-                del self.data[i][nid]
+        for child in self.data[nid]:
+            self.parents[child].discard(nid)
+        for parent in self.parents[nid]:
+            del self.data[parent][nid]
+        self.data[nid] = {}
+        self.parents[nid] = set()
+
+    def _Export(self):
+        src, dst, weights = self.Edges()
+        return { 'src': src, 'dst': dst, 'weights': weights }
+
+    @classmethod
+    def _Import(cls, N, arrays):
+        storage = cls(N)
+        storage.SetMany(arrays['src'], arrays['dst'], arrays['weights'])
+        return storage
+
+
+
+
+
+class CSRStorage(StorageBase):
+    # Out-edges are CSR arrays; in-edges are CSC arrays of positions into
+    # the CSR arrays. New edges are buffered per row in _pending (with the
+    # reverse index in _pendingcols), which single-node reads merge in.
+    # _Flush rebuilds the arrays once the buffer outgrows a fraction of
+    # the stored edges, or before a whole-graph operation. Deleted edges
+    # are zeroed in place and dropped on the next rebuild.
+
+    # Pending edges allowed before a rebuild: the larger of these
+    _flushMin = 1024
+    _flushRatio = 8
+
+    def __init__(self, N, dtype=np.float64):
+        super(CSRStorage, self).__init__(N)
+        self.dtype = np.dtype(dtype)
+        self._ClearPending()
+        empty = np.zeros(0, dtype=np.int64)
+        self._Build(empty, empty, np.zeros(0, dtype=self.dtype))
+
+    def Get(self, n1, n2):
+        self._IdGuard(n1, n2)
+        return self._Get(n1, n2)
+
+    def _Get(self, n1, n2):
+        pos = self._Find(n1, n2)
+        if pos < 0:
+            return self._pending.get(n1, {}).get(n2, 0)
+        return self.weights[pos]
+
+    def Set(self, n1, n2, val):
+        self._IdGuard(n1, n2)
+        self._Set(n1, n2, val)
+
+    def _Set(self, n1, n2, val):
+        pos = self._Find(n1, n2)
+        if pos >= 0:
+            self.weights[pos] = val
+            return
+
+        row = self._pending.get(n1)
+        if val != 0:
+            if row is None:
+                row = self._pending[n1] = {}
+            if n2 not in row:
+                self._pendingcols.setdefault(n2, set()).add(n1)
+                self._npending += 1
+            row[n2] = val
+            if self._npending > max(self._flushMin,
+                    len(self.indices) // self._flushRatio):
+                self._Flush()
+        elif row is not None and n2 in row:
+            self._Unpend(n1, n2)
+
+    def GetMany(self, src, dst):
+        src, dst = self._IdArrayGuard(src, dst)
+        return self._GetMany(src, dst)
+
+    def _GetMany(self, src, dst):
+        pos = self._FindMany(src, dst)
+        found = pos >= 0
+        result = np.zeros(len(src), dtype=self.dtype)
+        result[found] = self.weights[pos[found]]
+        if self._npending > 0:
+            missing = np.flatnonzero(~found)
+            pending = self._pending
+            result[missing] = [ pending.get(n1, {}).get(n2, 0) for n1, n2
+                in zip(src[missing].tolist(), dst[missing].tolist()) ]
+        return result
+
+    def SetMany(self, src, dst, vals):
+        src, dst, vals = self._BatchArrays(src, dst, vals)
+        self._SetMany(src, dst, vals)
+
+    def _SetMany(self, src, dst, vals):
+        self._Flush()
+        src, dst, vals = _LastWrites(src, dst, vals, self.N)
+
+        pos = self._FindMany(src, dst)
+        found = pos >= 0
+        self.weights[pos[found]] = vals[found]
+
+        new = ~found & (vals != 0)
+        if new.any():
+            live = self.weights != 0
+            old = self._RowIds()
+            self._Build(
+                    np.concatenate((old[live], src[new])),
+                    np.concatenate((self.indices[live], dst[new])),
+                    np.concatenate((self.weights[live], vals[new])))
+
+    def AddNode(self):
+        # Rows past the current arrays are implicitly empty, and rows of
+        # removed nodes were zeroed, so there is nothing to allocate here.
+        self.N += 1
+
+    def AddNodes(self, k):
+        self._CountGuard(k)
+        self.N += k
+
+    def Remove(self):
+        nid = self.N - 1
+        self.Zero(nid)
+        self.N -= 1
+        if nid < self._span:
+            # Drop the node's entries so no stored id is left >= N
+            rows = self._RowIds()
+            self._Keep((rows != nid) & (self.indices != nid), rows, nid)
+
+    def Zero(self, nid):
+        self._IdGuard(nid)
+        for n2 in list(self._pending.get(nid, ())):
+            self._Unpend(nid, n2)
+        for n1 in list(self._pendingcols.get(nid, ())):
+            self._Unpend(n1, nid)
+
+        if nid < self._span:
+            self.weights[self.indptr[nid]:self.indptr[nid + 1]] = 0
+            self.weights[self._ColumnPositions(nid)] = 0
+
+    def Children(self, nid):
+        return iter(self.ChildIdArray(nid).tolist())
+
+    def Parents(self, nid):
+        return iter(self.ParentIdArray(nid).tolist())
+
+    def ChildIdArray(self, nid):
+        return self.NeighborWeights(nid)[0]
+
+    def _ChildIdArray(self, nid):
+        return self._NeighborWeights(nid)[0]
+
+    def ParentIdArray(self, nid):
+        self._IdGuard(nid)
+        return self._ParentIdArray(nid)
+
+    def _ParentIdArray(self, nid):
+        if nid < self._span:
+            pos = self._ColumnPositions(nid)
+            pos = pos[self.weights[pos] != 0]
+            ids = np.searchsorted(self.indptr, pos, side='right') - 1
+        else:
+            ids = np.zeros(0, dtype=np.int64)
+
+        col = self._pendingcols.get(nid)
+        if col:
+            ids = np.sort(np.concatenate((ids,
+                np.fromiter(col, dtype=np.int64, count=len(col)))))
+        return ids
+
+    def NeighborWeights(self, nid):
+        self._IdGuard(nid)
+        return self._NeighborWeights(nid)
+
+    def _NeighborWeights(self, nid):
+        if nid < self._span:
+            start, end = self.indptr[nid], self.indptr[nid + 1]
+            weights = self.weights[start:end]
+            live = weights != 0
+            ids, weights = self.indices[start:end][live].astype(np.int64), weights[live]
+        else:
+            ids, weights = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=self.dtype)
+
+        row = self._pending.get(nid)
+        if row:
+            ids = np.concatenate((ids, np.fromiter(row, dtype=np.int64, count=len(row))))
+            weights = np.concatenate((weights,
+                np.array(list(row.values()), dtype=self.dtype)))
+            order = np.argsort(ids, kind='stable')
+            ids, weights = ids[order], weights[order]
+        return ids, weights
+
+    def Edges(self):
+        self._Flush()
+        live = self.weights != 0
+        return self._RowIds()[live], \
+                self.indices[live].astype(np.int64), self.weights[live]
+
+    def Compact(self, keep):
+        keep, = self._IdArrayGuard(keep)
+        mapping = _Renumbering(keep, self.N)
+        src, dst, weights = self.Edges()
+        src, dst = mapping[src], mapping[dst]
+        live = (src >= 0) & (dst >= 0)
+        self.N = len(keep)
+        self._Build(src[live], dst[live], weights[live])
+
+    def __len__(self):
+        return self.N
+
+    def _Find(self, n1, n2):
+        if n1 >= self._span or n2 >= self._span:
+            return -1
+        start, end = self.indptr[n1], self.indptr[n1 + 1]
+        pos = start + np.searchsorted(self.indices[start:end], n2)
+        if pos < end and self.indices[pos] == n2:
+            return pos
+        return -1
+
+    def _FindMany(self, src, dst):
+        # Rows are sorted, so the flattened (src, dst) keys of the stored
+        # edges are sorted too and can be searched all at once.
+        if len(self.indices) == 0:
+            return np.full(len(src), -1, dtype=np.int64)
+        # Stored ids can reach _span, which exceeds N after a Remove
+        width = max(self.N, self._span)
+        keys = self._RowIds() * width + self.indices
+        query = src * width + dst
+        pos = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+        return np.where(keys[pos] == query, pos, -1)
+
+    def _RowIds(self):
+        return np.repeat(np.arange(self._span), np.diff(self.indptr))
+
+    def _Export(self):
+        self._Flush()
+        return { 'indptr': self.indptr, 'indices': self.indices,
+            'weights': self.weights, 'cindptr': self.cindptr, 'cpos': self.cpos }
+
+    @classmethod
+    def _Import(cls, N, arrays):
+        storage = cls.__new__(cls)
+        StorageBase.__init__(storage, N)
+        storage._ClearPending()
+        storage._span = len(arrays['indptr']) - 1
+        for name in ('indptr', 'indices', 'weights', 'cindptr', 'cpos'):
+            setattr(storage, name, arrays[name])
+        storage.dtype = storage.weights.dtype
+        return storage
+
+    def _ColumnPositions(self, nid):
+        return self.cpos[self.cindptr[nid]:self.cindptr[nid + 1]]
+
+    def _Flush(self):
+        if self._npending == 0:
+            return
+
+        src = self._RowIds()
+        live = self.weights != 0
+
+        rows = self._pending
+        psrc = np.fromiter((n1 for n1, row in rows.items() for n2 in row),
+                dtype=np.int64, count=self._npending)
+        pdst = np.fromiter((n2 for row in rows.values() for n2 in row),
+                dtype=np.int64, count=self._npending)
+        pweights = np.array([ w for row in rows.values() for w in row.values() ],
+                dtype=self.dtype)
+
+        self._Build(
+                np.concatenate((src[live], psrc)),
+                np.concatenate((self.indices[live], pdst)),
+                np.concatenate((self.weights[live], pweights)))
+        self._ClearPending()
+
+    def _Keep(self, keep, rows, span):
+        # Filters the stored entries in place of a rebuild: rows and
+        # columns stay sorted, so only the offsets need recounting
+        newpos = np.cumsum(keep) - 1
+        self.indices = self.indices[keep]
+        self.weights = self.weights[keep]
+        self.indptr = np.zeros(span + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows[keep], minlength=span), out=self.indptr[1:])
+
+        cpos = self.cpos[keep[self.cpos]]
+        self.cpos = newpos[cpos].astype(self.cpos.dtype)
+        self.cindptr = np.zeros(span + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=span), out=self.cindptr[1:])
+        self._span = span
+
+    def _ClearPending(self):
+        self._pending = {}
+        self._pendingcols = {}
+        self._npending = 0
+
+    def _Unpend(self, n1, n2):
+        row = self._pending[n1]
+        del row[n2]
+        if not row:
+            del self._pending[n1]
+        col = self._pendingcols[n2]
+        col.discard(n1)
+        if not col:
+            del self._pendingcols[n2]
+        self._npending -= 1
+
+    def _Build(self, src, dst, weights):
+        order = np.lexsort((dst, src))
+        src = src[order]
+        dst = dst[order]
+        itype = np.int32 if len(order) < 2**31 and self.N < 2**31 else np.int64
+
+        self._span = self.N
+        self.indptr = np.zeros(self.N + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=self.N), out=self.indptr[1:])
+        self.indices = dst.astype(itype)
+        self.weights = np.asarray(weights, dtype=self.dtype)[order]
+
+        self.cindptr = np.zeros(self.N + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=self.N), out=self.cindptr[1:])
+        self.cpos = np.argsort(dst, kind='stable').astype(itype)
+
+
+
+def _PackedLength(N):
+    return (N + 7) // 8
+
+
+def _Renumbering(keep, N):
+    # Maps each old id to its position in keep, or -1 if it is dropped
+    mapping = np.full(N, -1, dtype=np.int64)
+    mapping[keep] = np.arange(len(keep))
+    return mapping
+
+
+def _LastWrites(src, dst, vals, N):
+    # Keep only the last write to each (src, dst) pair, as a loop would
+    keys = (src * N + dst)[::-1]
+    _, index = np.unique(keys, return_index=True)
+    index = len(keys) - 1 - index
+    return src[index], dst[index], vals[index]
+
+
+
+
+
+class AutoStorage(StorageBase):
+    # Wraps a sparse or a dense backend and converts between them as the
+    # edge density (nonzero edges / N^2) crosses denseAt going up or
+    # sparseAt going down. The gap between the two keeps a graph near a
+    # threshold from converting back and forth.
+
+    def __init__(self, N, sparse=None, dense=None, denseAt=0.1, sparseAt=0.02):
+        super(AutoStorage, self).__init__(N)
+        if not 0 <= sparseAt < denseAt:
+            raise ValueError("sparseAt must be below denseAt")
+        self.sparse = ListStorage if sparse is None else sparse
+        self.dense = MatrixStorage if dense is None else dense
+        self.denseAt = denseAt
+        self.sparseAt = sparseAt
+        self.inner = self.sparse(N)
+        self.nnz = 0
+
+    def IsDense(self):
+        return isinstance(self.inner, self.dense)
+
+    def Get(self, n1, n2):
+        return self.inner.Get(n1, n2)
+
+    def Set(self, n1, n2, val):
+        old = self.inner.Get(n1, n2)
+        self.inner.Set(n1, n2, val)
+        self.nnz += int(val != 0) - int(old != 0)
+        self._Rebalance()
+
+    def GetMany(self, src, dst):
+        return self.inner.GetMany(src, dst)
+
+    def SetMany(self, src, dst, vals):
+        src, dst, vals = self._BatchArrays(src, dst, vals)
+        src, dst, vals = _LastWrites(src, dst, vals, self.N)
+        old = self.inner.GetMany(src, dst)
+        self.inner.SetMany(src, dst, vals)
+        self.nnz += int(np.count_nonzero(vals) - np.count_nonzero(old))
+        self._Rebalance()
+
+    def AddNode(self):
+        self.AddNodes(1)
+
+    def AddNodes(self, k):
+        self._CountGuard(k)
+        self.inner.AddNodes(k)
+        self.N += k
+        self._Rebalance()
+
+    def Remove(self):
+        self.nnz -= self._Degree(self.N - 1)
+        self.inner.Remove()
+        self.N -= 1
+        self._Rebalance()
+
+    def Zero(self, nid):
+        self._IdGuard(nid)
+        self.nnz -= self._Degree(nid)
+        self.inner.Zero(nid)
+        self._Rebalance()
+
+    def Children(self, nid):
+        return self.inner.Children(nid)
+
+    def Parents(self, nid):
+        return self.inner.Parents(nid)
+
+    def ChildIdArray(self, nid):
+        return self.inner.ChildIdArray(nid)
+
+    def ParentIdArray(self, nid):
+        return self.inner.ParentIdArray(nid)
+
+    def NeighborWeights(self, nid):
+        return self.inner.NeighborWeights(nid)
+
+    def Edges(self):
+        return self.inner.Edges()
+
+    def _Get(self, n1, n2):
+        return self.inner._Get(n1, n2)
+
+    def _GetMany(self, src, dst):
+        return self.inner._GetMany(src, dst)
+
+    def _ChildIdArray(self, nid):
+        return self.inner._ChildIdArray(nid)
+
+    def _ParentIdArray(self, nid):
+        return self.inner._ParentIdArray(nid)
+
+    def _NeighborWeights(self, nid):
+        return self.inner._NeighborWeights(nid)
+
+    def Compact(self, keep):
+        keep, = self._IdArrayGuard(keep)
+        self.inner.Compact(keep)
+        self.N = len(keep)
+        self.nnz = int(np.count_nonzero(self.inner.Edges()[2]))
+        self._Rebalance()
+
+    def __len__(self):
+        assert(len(self.inner) == self.N)
+        return self.N
+
+    def _Degree(self, nid):
+        # Nonzero edges touching nid, counting a self loop once
+        _, weights = self.inner.NeighborWeights(nid)
+        parents = self.inner.ParentIdArray(nid)
+        incoming = self.inner.GetMany(parents, np.full(len(parents), nid))
+        loop = self.inner.Get(nid, nid) != 0
+        return int(np.count_nonzero(weights) + np.count_nonzero(incoming) - loop)
+
+    def _Rebalance(self):
+        density = float(self.nnz) / max(1, self.N * self.N)
+        if self.IsDense():
+            if density < self.sparseAt:
+                self.inner = self.inner.ConvertTo(self.sparse)
+        elif density > self.denseAt:
+            self.inner = self.inner.ConvertTo(self.dense)
+
+    def _Export(self):
+        arrays = dict(('inner.' + name, arr)
+                for name, arr in self.inner._Export().items())
+        arrays['kind'] = np.array([ type(self.inner).__name__.encode('ascii') ])
+        return arrays
+
+    @classmethod
+    def _Import(cls, N, arrays):
+        storage = cls(0)
+        prefix = 'inner.'
+        inner = dict((key[len(prefix):], arr)
+                for key, arr in arrays.items() if key.startswith(prefix))
+        kind = arrays['kind'][0].decode('ascii')
+        storage.inner = _storageTypes[kind]._Import(N, inner)
+        storage.N = N
+        storage.nnz = int(np.count_nonzero(storage.inner.Edges()[2]))
+        if storage.IsDense():
+            storage.dense = type(storage.inner)
+        else:
+            storage.sparse = type(storage.inner)
+        return storage
 
 
 
+_storageTypes = dict((cls.__name__, cls) for cls in (MatrixStorage,
+    MemmapMatrixStorage, BitMatrixStorage, ListStorage, CSRStorage, AutoStorage))
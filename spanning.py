@@ -0,0 +1,108 @@
+import heapq
+import numpy as np
+from .graph import Graph
+from .graphiter import _liveids, _mergeadjacency
+from .graphstorage import ListStorage
+from .tree import TreeNode, _TreeBundle
+from .unionfind import UnionFind
+
+# Minimum spanning forests. Edge direction is ignored and a weight of 0
+# means there is no edge. Both routines return (src, dst, weights) arrays
+# with one entry per forest edge.
+
+
+def kruskal(graph):
+    # Edges are oriented from the lower id to the higher
+    if not isinstance(graph, Graph):
+        raise TypeError("kruskal must be given a graph.")
+    src, dst, weights = graph.storage.Edges()
+    keep = src != dst
+    src, dst, weights = src[keep], dst[keep], weights[keep]
+    src, dst = np.minimum(src, dst), np.maximum(src, dst)
+
+    sets = UnionFind(len(graph.storage))
+    order = np.argsort(weights, kind='stable')
+    chosen = []
+    for i, u, v in zip(order.tolist(), src[order].tolist(), dst[order].tolist()):
+        if sets.Union(u, v):
+            chosen.append(i)
+            if sets.sets == 1:
+                break
+    chosen = np.array(chosen, dtype=np.int64)
+    return src[chosen], dst[chosen], weights[chosen]
+
+def prim(graph, root=None):
+    # Grows each tree from its lowest live id, or from root first if one
+    # is given. Edges are oriented from parent to child.
+    if not isinstance(graph, Graph):
+        raise TypeError("prim must be given a graph.")
+    indptr, indices, weights = graph.Adjacency()
+    if graph.directed:
+        rptr, rindices, rweights = graph.Adjacency(reverse=True)
+        merged, indices = _mergeadjacency(indptr, indices, rptr, rindices)
+        _, weights = _mergeadjacency(indptr, weights, rptr, rweights)
+        indptr = merged
+
+    roots = _liveids(graph)
+    if root is not None:
+        root = Graph._NodeId(root)
+        graph._IdGuard(root)
+        roots.insert(0, root)
+
+    N = len(indptr) - 1
+    done = np.zeros(N, dtype=bool)
+    src, dst, chosen = [], [], []
+    for start in roots:
+        if done[start]:
+            continue
+        heap = [ (0, 0, start, -1, -1) ]
+        counter = 1
+        while heap:
+            w, _, u, parent, k = heapq.heappop(heap)
+            if done[u]:
+                continue
+            done[u] = True
+            if parent >= 0:
+                src.append(parent)
+                dst.append(u)
+                chosen.append(k)
+
+            first, last = indptr[u], indptr[u + 1]
+            nbrs = indices[first:last]
+            fresh = np.flatnonzero(~done[nbrs])
+            for v, i in zip(nbrs[fresh].tolist(), (fresh + first).tolist()):
+                # counter breaks ties without comparing further fields
+                heapq.heappush(heap, (weights[i], counter, v, u, i))
+                counter += 1
+
+    chosen = np.array(chosen, dtype=np.int64)
+    return np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64), \
+            weights[chosen]
+
+def spanningtree(graph, edges, root):
+    # Builds a tree.TreeNode hierarchy rooted at root from forest edges
+    # (src, dst, weights). Tree node ids match graph ids; nodes outside
+    # root's tree are left unattached.
+    if not isinstance(graph, Graph):
+        raise TypeError("spanningtree must be given a graph.")
+    root = Graph._NodeId(root)
+    graph._IdGuard(root)
+    src, dst, weights = edges
+
+    N = len(graph.storage)
+    nbrs = [ [] for i in range(N) ]
+    for u, v, w in zip(src.tolist(), dst.tolist(), weights.tolist()):
+        nbrs[u].append((v, w))
+        nbrs[v].append((u, w))
+
+    tree = Graph(N, True, storage=ListStorage)
+    seen = set([ root ])
+    stack = [ root ]
+    while stack:
+        u = stack.pop()
+        for v, w in nbrs[u]:
+            if v not in seen:
+                seen.add(v)
+                tree.SetWeight(u, v, w)
+                stack.append(v)
+    return TreeNode(bundle=_TreeBundle(tree, root), nid=root)
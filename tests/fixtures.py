@@ -0,0 +1,15 @@
+from ..graph import Graph
+
+class GraphFixture(object):
+    # Mixin for test bases that run once per storage backend. A concrete
+    # test class sets storage (None for the Graph default) and directed,
+    # and also inherits TestCase; the base itself is never collected.
+    storage = None
+    directed = True
+
+    def makeGraph(self, N, directed=None):
+        if directed is None:
+            directed = self.directed
+        if self.storage is None:
+            return Graph(N, directed)
+        return Graph(N, directed, storage=self.storage)
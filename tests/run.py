@@ -1,7 +1,17 @@
+import sys
 import unittest
-from . import testStorage, testGraph, testIter, testTree
+from . import testStorage, testGraph, testIter, testTree, testSearch, \
+        testParallel, testOrder, testCentrality, testSpanning, \
+        testFlow
 
-_allModules = (testStorage, testGraph, testIter, testTree)
+_allModules = (testStorage, testGraph, testIter, testTree, testSearch,
+        testParallel, testOrder, testCentrality, testSpanning,
+        testFlow)
+
+# graphasync uses Python 3 only syntax
+if sys.version_info >= (3, 7):
+    from . import testAsync
+    _allModules += (testAsync,)
 
 def runAll():
     for mod in _allModules:
@@ -0,0 +1,112 @@
+import asyncio
+import time
+import unittest
+import numpy as np
+from unittest import TestSuite, TestCase
+from ..graph import Graph
+from ..graphstorage import ListStorage
+from ..graphiter import bfsiditer, dfsiditer, bfsarrays, connected_components
+from ..graphasync import abfsiditer, adfsiditer, abfsiter, adfsiter, \
+        offload, abfsarrays, aconnected_components, atoposort
+
+def _collect(gen):
+    async def run():
+        return [ item async for item in gen ]
+    return asyncio.run(run())
+
+class AsyncIterTest(TestCase):
+    def setUp(self):
+        self.graph = Graph(200, True, storage=ListStorage)
+        self.graph.SetWeights(range(199), range(1, 200), 1)
+        self.graph.SetWeights(range(0, 190, 7), range(10, 200, 7), 1)
+
+    def test_order(self):
+        self.assertEqual(_collect(abfsiditer(self.graph, 0, every=3)),
+                list(bfsiditer(self.graph, 0)))
+        self.assertEqual(_collect(adfsiditer(self.graph, 5)),
+                list(dfsiditer(self.graph, 5)))
+        nodes = _collect(abfsiter(self.graph[0], every=10))
+        self.assertEqual([ n.nid for n in nodes ], list(bfsiditer(self.graph, 0)))
+        self.assertEqual(len(_collect(adfsiter(self.graph[190]))), 10)
+
+    def test_interleaves(self):
+        # Two traversals share the loop instead of running back to back
+        order = []
+        async def walk(name):
+            async for nid in abfsiditer(self.graph, 0, every=50):
+                order.append(name)
+        async def both():
+            await asyncio.gather(walk('a'), walk('b'))
+        asyncio.run(both())
+        self.assertEqual(len(order), 400)
+        self.assertNotEqual(order, sorted(order))
+
+    def test_budget(self):
+        async def slow():
+            async for nid in abfsiditer(self.graph, 0, every=1, budget=0.01):
+                time.sleep(0.002)
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(slow())
+
+    def test_cancel(self):
+        seen = []
+        async def walk():
+            async for nid in abfsiditer(self.graph, 0, every=1):
+                seen.append(nid)
+        async def main():
+            task = asyncio.ensure_future(walk())
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        asyncio.run(main())
+        self.assertTrue(0 < len(seen) < 200)
+
+    def test_invalid(self):
+        with self.assertRaises(TypeError):
+            abfsiditer(None, 0)
+        with self.assertRaises(TypeError):
+            abfsiter(0)
+        with self.assertRaises(KeyError):
+            adfsiditer(self.graph, 200)
+        with self.assertRaises(ValueError):
+            abfsiditer(self.graph, 0, every=0)
+        with self.assertRaises(ValueError):
+            adfsiter(self.graph[0], every=-1)
+
+class OffloadTest(TestCase):
+    def setUp(self):
+        self.graph = Graph(50, True, storage=ListStorage)
+        self.graph.SetWeights(range(49), range(1, 50), 1)
+
+    def test_queries(self):
+        async def main():
+            dist, pred = await abfsarrays(self.graph, [ 0 ])
+            labels = await aconnected_components(self.graph)
+            order = await atoposort(self.graph)
+            adjacency = await offload(self.graph.Adjacency, reverse=True)
+            return dist, labels, order, adjacency
+        dist, labels, order, adjacency = asyncio.run(main())
+        self.assertEqual(dist.tolist(), bfsarrays(self.graph, 0)[0].tolist())
+        self.assertEqual(labels.tolist(), connected_components(self.graph).tolist())
+        self.assertEqual(order.tolist(), list(range(50)))
+        self.assertEqual(adjacency[1][:2].tolist(), [ 0, 1 ])
+
+    def test_budget(self):
+        async def main():
+            await offload(time.sleep, 0.5, budget=0.01)
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(main())
+
+test_classes = (AsyncIterTest, OffloadTest)
+
+def load_tests(loader, standard_tests, unused):
+    suite = TestSuite()
+    for c in test_classes:
+        tests = loader.loadTestsFromTestCase(c)
+        suite.addTest(tests)
+    return suite
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import numpy as np
+from unittest import TestSuite, TestCase
+from ..graphstorage import ListStorage, CSRStorage
+from ..centrality import pagerank, eigenvector
+from .fixtures import GraphFixture
+
+def _densepagerank(weights, damping, jump):
+    # Solves the PageRank linear system directly
+    N = len(weights)
+    out = weights.sum(axis=1)
+    trans = np.zeros((N, N))
+    for u in range(N):
+        trans[u] = weights[u] / out[u] if out[u] > 0 else jump
+    system = np.eye(N) - damping * trans.T
+    return np.linalg.solve(system, (1 - damping) * jump)
+
+class _CentralityTestBase(GraphFixture):
+    def setUp(self):
+        rng = np.random.RandomState(4)
+        self.graph = self.makeGraph(10)
+        self.weights = np.zeros((10, 10))
+        for _ in range(25):
+            u, v = rng.randint(10, size=2).tolist()
+            w = int(rng.randint(1, 5))
+            self.graph.SetWeight(u, v, w)
+            self.weights[u, v] = w
+            if not self.directed:
+                self.weights[v, u] = w
+
+    def test_pagerank(self):
+        jump = np.full(10, 0.1)
+        scores = pagerank(self.graph, damping=0.8)
+        correct = _densepagerank(self.weights, 0.8, jump)
+        self.assertTrue(np.allclose(scores, correct, atol=1e-7))
+        self.assertAlmostEqual(scores.sum(), 1)
+
+    def test_personalized(self):
+        personal = np.zeros(10)
+        personal[[ 2, 7 ]] = [ 1, 3 ]
+        scores = pagerank(self.graph, personalization=personal)
+        correct = _densepagerank(self.weights, 0.85, personal / 4)
+        self.assertTrue(np.allclose(scores, correct, atol=1e-7))
+
+    def test_warm_start(self):
+        scores = pagerank(self.graph)
+        again = pagerank(self.graph, start=scores, maxiter=2)
+        self.assertTrue(np.allclose(scores, again, atol=1e-7))
+        with self.assertRaises(RuntimeError):
+            pagerank(self.graph, maxiter=2)
+
+    def test_eigenvector(self):
+        scores = eigenvector(self.graph)
+        vals, vecs = np.linalg.eig(self.weights.T)
+        top = np.argmax(vals.real)
+        correct = np.abs(vecs[:, top].real)
+        correct /= np.linalg.norm(correct)
+        self.assertTrue(np.allclose(scores, correct, atol=1e-5))
+        again = eigenvector(self.graph, start=scores, maxiter=3)
+        self.assertTrue(np.allclose(scores, again, atol=1e-6))
+
+    def test_removed(self):
+        self.graph.RemoveNode(4)
+        scores = pagerank(self.graph)
+        self.assertEqual(scores[4], 0)
+        self.assertAlmostEqual(scores.sum(), 1)
+        self.assertEqual(eigenvector(self.graph)[4], 0)
+
+    def test_invalid(self):
+        with self.assertRaises(TypeError):
+            pagerank(None)
+        with self.assertRaises(ValueError):
+            pagerank(self.graph, personalization=np.zeros(10))
+        with self.assertRaises(ValueError):
+            pagerank(self.graph, personalization=np.ones(3))
+        self.graph.SetWeight(0, 1, -1)
+        with self.assertRaises(ValueError):
+            eigenvector(self.graph)
+
+class MatrCentralityTest(_CentralityTestBase, TestCase):
+    pass
+
+class ListCentralityTest(_CentralityTestBase, TestCase):
+    storage = ListStorage
+
+class CSRCentralityTest(_CentralityTestBase, TestCase):
+    storage = CSRStorage
+
+class MatrUndirectedCentralityTest(_CentralityTestBase, TestCase):
+    directed = False
+
+class ListUndirectedCentralityTest(_CentralityTestBase, TestCase):
+    storage = ListStorage
+    directed = False
+
+test_classes = (MatrCentralityTest, ListCentralityTest, CSRCentralityTest,
+        MatrUndirectedCentralityTest, ListUndirectedCentralityTest)
+
+def load_tests(loader, standard_tests, unused):
+    suite = TestSuite()
+    for c in test_classes:
+        tests = loader.loadTestsFromTestCase(c)
+        suite.addTest(tests)
+    return suite
+
+if __name__ == "__main__":
+    unittest.main()
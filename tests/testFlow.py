@@ -0,0 +1,100 @@
+import unittest
+import numpy as np
+from unittest import TestSuite, TestCase
+from ..graphstorage import ListStorage, CSRStorage
+from ..flow import maxflow, FlowNetwork
+from .fixtures import GraphFixture
+
+class _FlowTestBase(GraphFixture):
+    def assertValidFlow(self, graph, net, source, sink, value, flows, cut):
+        src, dst = net.edges
+        N = len(graph.storage)
+        balance = np.bincount(dst, weights=flows, minlength=N) \
+                - np.bincount(src, weights=flows, minlength=N)
+        for nid in range(N):
+            if nid not in (source, sink):
+                self.assertAlmostEqual(balance[nid], 0)
+        self.assertAlmostEqual(balance[sink], value)
+
+        caps = graph.GetWeights(src, dst)
+        self.assertTrue((np.abs(flows) <= caps + 1e-9).all())
+        if graph.directed:
+            self.assertTrue((flows >= 0).all())
+        self.assertTrue(cut[source] and not cut[sink])
+        crossing = cut[src] & ~cut[dst]
+        if not graph.directed:
+            crossing |= cut[dst] & ~cut[src]
+        self.assertAlmostEqual(caps[crossing].sum(), value)
+
+    def test_known(self):
+        graph = self.makeGraph(6)
+        graph.SetWeights([ 0, 0, 1, 2, 1, 3, 2, 4, 3 ],
+                [ 1, 2, 2, 1, 3, 2, 4, 3, 5 ],
+                [ 16, 13, 10, 4, 12, 9, 14, 7, 20 ])
+        graph.SetWeight(4, 5, 4)
+        value, flows, cut = maxflow(graph, 0, 5)
+        self.assertEqual(value, 23)
+        self.assertValidFlow(graph, FlowNetwork(graph), 0, 5, value, flows, cut)
+
+    def test_random(self):
+        rng = np.random.RandomState(12)
+        for directed in (True, False):
+            graph = self.makeGraph(15, directed)
+            for _ in range(40):
+                u, v = rng.randint(15, size=2).tolist()
+                graph.SetWeight(u, v, int(rng.randint(1, 10)))
+            net = FlowNetwork(graph)
+            for source, sink in ((0, 14), (3, 7), (14, 0)):
+                value, flows, cut = net.MaxFlow(source, sink)
+                self.assertValidFlow(graph, net, source, sink, value, flows, cut)
+
+    def test_storage_untouched(self):
+        graph = self.makeGraph(3)
+        graph.SetWeights([ 0, 1 ], [ 1, 2 ], [ 5, 3 ])
+        value, flows, cut = maxflow(graph, 0, 2)
+        self.assertEqual(value, 3)
+        self.assertEqual(cut.tolist(), [ True, True, False ])
+        self.assertEqual(graph.GetWeights([ 0, 1 ], [ 1, 2 ]).tolist(), [ 5, 3 ])
+
+    def test_disconnected(self):
+        graph = self.makeGraph(4)
+        graph.SetWeight(0, 1, 2)
+        graph.RemoveNode(2)
+        value, flows, cut = maxflow(graph, 0, 3)
+        self.assertEqual(value, 0)
+        self.assertEqual(flows.tolist(), [ 0 ])
+        self.assertEqual(cut.tolist(), [ True, True, False, False ])
+
+    def test_invalid(self):
+        graph = self.makeGraph(3)
+        with self.assertRaises(TypeError):
+            maxflow(None, 0, 1)
+        with self.assertRaises(ValueError):
+            maxflow(graph, 1, 1)
+        graph.RemoveNode(1)
+        with self.assertRaises(KeyError):
+            maxflow(graph, 0, 1)
+        graph.SetWeight(0, 2, -1)
+        with self.assertRaises(ValueError):
+            FlowNetwork(graph)
+
+class MatrFlowTest(_FlowTestBase, TestCase):
+    pass
+
+class ListFlowTest(_FlowTestBase, TestCase):
+    storage = ListStorage
+
+class CSRFlowTest(_FlowTestBase, TestCase):
+    storage = CSRStorage
+
+test_classes = (MatrFlowTest, ListFlowTest, CSRFlowTest)
+
+def load_tests(loader, standard_tests, unused):
+    suite = TestSuite()
+    for c in test_classes:
+        tests = loader.loadTestsFromTestCase(c)
+        suite.addTest(tests)
+    return suite
+
+if __name__ == "__main__":
+    unittest.main()
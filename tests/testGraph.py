@@ -1,7 +1,12 @@
+import os
+import shutil
+import tempfile
 import unittest
+import numpy as np
 from unittest import TestSuite, TestCase
 from ..graph import Graph
-from ..graphstorage import MatrixStorage, ListStorage
+from ..graphstorage import MatrixStorage, ListStorage, CSRStorage, \
+        BitMatrixStorage, AutoStorage
 
 class _GraphTestBase(TestCase):
     def setUp(self):
@@ -77,6 +82,13 @@ class _GraphTestBase(TestCase):
         self.assertTrue(n1.graph is g)
         self.assertTrue(n3.graph is g)
 
+    def test_node_slots(self):
+        node = self.graph[1]
+        with self.assertRaises(AttributeError):
+            node.extra = 1
+        with self.assertRaises(TypeError):
+            _ = type(node)(None, 1)
+
     def test_data(self):
         g = self.graph
 
@@ -116,6 +128,22 @@ class _GraphTestBase(TestCase):
 
         self.assert_access_eq(nid, 4, -1)
 
+    def test_add_nodes(self):
+        g = self.graph
+        g.RemoveNode(2)
+        nodes = g.AddNodes(3)
+
+        self.assertEqual(len(nodes), 3)
+        self.assertEqual(len(g), 7)
+        self.assertEqual(sorted(n.nid for n in nodes), [ 2, 5, 6 ])
+
+        self.assert_access_eq(1, 2, 0)
+        self.assert_access_eq(6, 0, 0)
+        self.assert_data_eq(6, None)
+
+        g.SetWeight(6, 5, 2)
+        self.assert_access_eq(6, 5, 2)
+
     def test_remove_node(self):
         g = self.graph
         g.SetWeight(1,2,4)
@@ -222,6 +250,216 @@ class _GraphTestBase(TestCase):
         self.assertEqual(y, [])
         self.assertEqual(z, [])
 
+    def test_id_arrays(self):
+        g = self.graph
+        g.SetWeight(1, 4, 2)
+
+        self.assertEqual(sorted(g.ChildIdArray(1).tolist()), [ 2, 4 ])
+        self.assertEqual(g[2].ParentIdArray().tolist(), [ 1 ])
+
+        ids, weights = g[1].NeighborWeights()
+        self.assertEqual(sorted(zip(ids.tolist(), weights.tolist())), [ (2, 5), (4, 2) ])
+
+        g.RemoveNode(1)
+        with self.assertRaises(KeyError):
+            g.ChildIdArray(1)
+        self.assertEqual(g.ParentIdArray(2).tolist(), [])
+
+    def test_set_weights(self):
+        g = self.graph
+        g.SetWeights(np.array([ 0, 3, 4 ]), np.array([ 4, 2, 0 ]), np.array([ 1, 2, 3 ]))
+
+        self.assert_access_eq(0, 4, 1)
+        self.assert_access_eq(3, 2, 2)
+        self.assert_access_eq(4, 0, 3)
+        self.assertEqual(g.GetWeights([ 1, 0, 2 ], [ 2, 4, 2 ]).tolist(), [ 5, 1, 0 ])
+
+    def test_set_weights_invalid(self):
+        g = self.graph
+        g.RemoveNode(3)
+        with self.assertRaises(KeyError):
+            g.SetWeights([ 0, 1 ], [ 3, 4 ], 1)
+        with self.assertRaises(KeyError):
+            g.GetWeights([ 0, 5 ], [ 1, 1 ])
+        with self.assertRaises(TypeError):
+            g.GetWeights([ "a" ], [ 1 ])
+        self.assert_access_eq(1, 4, 0)
+
+    def test_save_load(self):
+        g = self.graph
+        g.SetWeight(4, 0, 2)
+        g.RemoveNode(2)
+        g.SetData(4, [ "x", 1 ])
+        g.AddAttribute("score", np.float32, default=1.5)
+        g.SetAttribute("score", [ 0 ], 3)
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "graph.pyg")
+            g.Save(path)
+
+            for mmap in (True, False):
+                self.graph = Graph.Load(path, mmap=mmap)
+                self.assertIsInstance(self.graph.storage, type(g.storage))
+                self.assertEqual(self.graph.directed, g.directed)
+                self.assertEqual(len(self.graph), 4)
+                self.assert_access_eq(4, 0, 2)
+                self.assert_access_fail(1, 2)
+                self.assert_data_eq(3, 6)
+                self.assert_data_eq(4, [ "x", 1 ])
+                self.assertEqual(self.graph.ParentIdArray(0).tolist(), [ 4 ])
+                self.assertEqual(self.graph.AttributeArray("score").tolist(),
+                        [ 3, 1.5, 1.5, 1.5, 1.5 ])
+
+                node = self.graph.AddNode()
+                self.assertEqual(node.nid, 2)
+                self.graph.SetWeight(2, 4, 7)
+                self.assert_access_eq(2, 4, 7)
+                self.graph.AddNodes(3)
+                self.assert_access_eq(4, 0, 2)
+
+            self.graph = Graph.Load(path)
+            self.assert_access_fail(2, 4)
+        finally:
+            self.graph = None
+            shutil.rmtree(tmpdir)
+
+    def test_save_over_loaded(self):
+        self.graph.SetWeight(4, 0, 2)
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "graph.pyg")
+            self.graph.Save(path)
+
+            # Saving back to the file the graph is mapped from
+            g = Graph.Load(path)
+            g.Save(path)
+            g.SetWeight(1, 3, 5)
+            g.Save(path)
+            self.assertEqual(g.GetWeight(4, 0), 2)
+
+            self.graph = Graph.Load(path)
+            self.assert_access_eq(4, 0, 2)
+            self.assert_access_eq(1, 3, 5)
+            self.assertEqual(sorted(os.listdir(tmpdir)), [ "graph.pyg" ])
+        finally:
+            g = self.graph = None
+            shutil.rmtree(tmpdir)
+
+    def test_attributes(self):
+        g = self.graph
+        g.AddAttribute("score", np.float32)
+        g.AddAttribute("rank", np.int16, default=-1)
+
+        g.SetAttribute("score", [ 1, 3 ], [ 0.5, 2.5 ])
+        g.SetAttribute("rank", np.array([ 4 ]), 7)
+
+        self.assertEqual(g.GetAttribute("score", [ 3, 1, 0 ]).tolist(), [ 2.5, 0.5, 0 ])
+        self.assertEqual(g.AttributeArray("rank").tolist(), [ -1, -1, -1, -1, 7 ])
+        self.assertEqual(g.AttributeArray("score").dtype, np.float32)
+
+        with self.assertRaises(KeyError):
+            g.AddAttribute("score", np.float64)
+        with self.assertRaises(KeyError):
+            g.GetAttribute("missing", [ 0 ])
+        with self.assertRaises(KeyError):
+            g.SetAttribute("score", [ 5 ], 1)
+
+    def test_attributes_follow_nodes(self):
+        g = self.graph
+        g.AddAttribute("rank", np.int32, default=-1)
+        g.SetAttribute("rank", [ 0, 1, 2, 3, 4 ], [ 10, 11, 12, 13, 14 ])
+
+        g.RemoveNode(4)
+        g.RemoveNode(1)
+        self.assertEqual(g.AttributeArray("rank").tolist(), [ 10, -1, 12, 13 ])
+        with self.assertRaises(KeyError):
+            g.GetAttribute("rank", [ 1 ])
+
+        g.AddNode()
+        g.AddNodes(20)
+        self.assertEqual(g.GetAttribute("rank", [ 1, 4, 23 ]).tolist(), [ -1, -1, -1 ])
+
+        for nid in range(23, 2, -1):
+            g.RemoveNode(nid)
+        g.RemoveNode(0)
+        mapping = g.Compact()
+        self.assertEqual(mapping.tolist(), [ -1, 0, 1 ])
+        self.assertEqual(g.AttributeArray("rank").tolist(), [ -1, 12 ])
+
+    def test_compact(self):
+        g = self.graph
+        g.SetWeight(4, 2, 3)
+        g.SetData(4, "four")
+        g.RemoveNode(0)
+        g.RemoveNode(3)
+
+        mapping = g.Compact()
+        self.assertEqual(mapping.tolist(), [ -1, 0, 1, -1, 2 ])
+        self.assertEqual(len(g), 3)
+        self.assertEqual(len(g.storage), 3)
+        self.assert_access_eq(0, 1, 5)
+        self.assert_access_eq(2, 1, 3)
+        self.assert_data_eq(2, "four")
+        self.assert_access_fail(0, 3)
+
+        node = g.AddNode()
+        self.assertEqual(node.nid, 3)
+
+    def test_convert_storage(self):
+        g = self.graph
+        g.SetWeight(4, 1, 2)
+        g.RemoveNode(3)
+
+        for cls in (MatrixStorage, ListStorage, CSRStorage, AutoStorage):
+            g.ConvertStorage(cls)
+            self.assertIsInstance(g.storage, cls)
+            self.assertEqual(len(g), 4)
+            self.assert_access_eq(1, 2, 5)
+            self.assert_access_eq(4, 1, 2)
+            self.assert_access_fail(3, 1)
+            self.assertEqual(g.ParentIdArray(1).tolist(), [ 4 ])
+
+    def test_adjacency(self):
+        g = self.graph
+        g.SetWeight(1, 0, 2)
+        g.SetWeight(4, 1, 3)
+        indptr, indices, weights = g.Adjacency()
+        self.assertEqual(indptr.tolist(), [ 0, 0, 2, 2, 2, 3 ])
+        self.assertEqual(sorted(zip(indices[0:2].tolist(), weights[0:2].tolist())),
+                [ (0, 2), (2, 5) ])
+        self.assertEqual(indices[2:].tolist(), [ 1 ])
+
+        indptr, indices, weights = g.Adjacency(reverse=True)
+        self.assertEqual(indptr.tolist(), [ 0, 1, 2, 3, 3, 3 ])
+        self.assertEqual(indices.tolist(), [ 1, 4, 1 ])
+
+    def test_unchecked(self):
+        g = self.graph
+        with g.Unchecked() as u:
+            u.SetWeight(0, 4, 2)
+            u.SetWeights(np.array([ 3, 4 ]), np.array([ 4, 3 ]), 6)
+            self.assertEqual(u.GetWeight(1, 2), 5)
+            self.assertEqual(u.GetWeights([ 0, 3 ], [ 4, 4 ]).tolist(), [ 2, 6 ])
+            self.assertEqual(sorted(u.ChildIds(np.int64(4))), [ 3 ])
+            self.assertEqual(sorted(u.ParentIdArray(4).tolist()), [ 0, 3 ])
+
+            ids, weights = u.NeighborWeights(1)
+            self.assertEqual(list(zip(ids.tolist(), weights.tolist())), [ (2, 5) ])
+
+        self.assert_access_eq(0, 4, 2)
+        self.assert_access_eq(4, 3, 6)
+
+    def test_unchecked_validates_batch(self):
+        g = self.graph
+        g.RemoveNode(2)
+        with self.assertRaises(KeyError):
+            g.Unchecked([ 0, 2 ])
+        with self.assertRaises(KeyError):
+            g.Unchecked(np.array([ 7 ]))
+        u = g.Unchecked(np.array([ 0, 1, 3 ]))
+        self.assertEqual(u.GetWeight(0, 1), 0)
+
     def test_use_node_for_ops(self):
         g = self.graph
         node1 = g[1]
@@ -241,13 +479,122 @@ class _GraphTestBase(TestCase):
 
 class MatrGraphTest(_GraphTestBase):
     def create(self, size):
-        return Graph(size, False, storage=MatrixStorage)
+        return Graph(size, True, storage=MatrixStorage)
+
+    def test_storage_args(self):
+        g = Graph(3, storage=MatrixStorage, dtype=np.float32)
+        self.assertEqual(g.storage.matr.dtype, np.float32)
+        g.SetWeight(0, 2, 1.5)
+        self.assertEqual(g.GetWeight(0, 2), 1.5)
+
+    def test_save_load_storage_options(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "graph.pyg")
+            g = Graph(10, True, storage=BitMatrixStorage)
+            g.SetWeight(3, 9, 1)
+            g.Save(path)
+            g = Graph.Load(path)
+            self.assertIsInstance(g.storage, BitMatrixStorage)
+            self.assertEqual(g.ChildIdArray(3).tolist(), [ 9 ])
+            g.Save(path)
+            g = Graph.Load(path)
+            self.assertEqual(g.ChildIdArray(3).tolist(), [ 9 ])
+
+            g = Graph(3, storage=MatrixStorage, dtype=np.int16)
+            g.SetWeight(0, 1, 300)
+            g.Save(path)
+            g = Graph.Load(path)
+            self.assertEqual(g.storage.matr.dtype, np.int16)
+            self.assertEqual(g.GetWeight(0, 1), 300)
+            g = None
+        finally:
+            shutil.rmtree(tmpdir)
 
 class ListGraphTest(_GraphTestBase):
     def create(self, size):
-        return Graph(size, False, storage=ListStorage)
+        return Graph(size, True, storage=ListStorage)
 
-test_classes = (MatrGraphTest, ListGraphTest)
+class CSRGraphTest(_GraphTestBase):
+    def create(self, size):
+        return Graph(size, True, storage=CSRStorage)
+
+class AutoGraphTest(_GraphTestBase):
+    def create(self, size):
+        return Graph(size, True, storage=AutoStorage)
+
+class _UndirectedTestBase(TestCase):
+    def setUp(self):
+        self.graph = Graph(5, False, storage=self.storage)
+        self.graph.SetWeight(3, 1, 5)
+        self.graph.SetWeight(1, 4, 2)
+        self.graph.SetWeight(2, 2, 1)
+
+    def test_symmetric(self):
+        g = self.graph
+        self.assertEqual(g.GetWeight(3, 1), 5)
+        self.assertEqual(g.GetWeight(1, 3), 5)
+        self.assertEqual(g[4][1], 2)
+        self.assertEqual(g.GetWeights([ 1, 3, 4, 2 ], [ 3, 1, 1, 2 ]).tolist(), [ 5, 5, 2, 1 ])
+
+        g.SetWeight(1, 3, 7)
+        self.assertEqual(g.GetWeight(3, 1), 7)
+
+    def test_stored_once(self):
+        g = self.graph
+        self.assertEqual(g.storage.Get(1, 3), 5)
+        self.assertEqual(g.storage.Get(3, 1), 0)
+        self.assertEqual(len(g.storage.Edges()[0]), 3)
+
+    def test_neighbors(self):
+        g = self.graph
+        self.assertEqual(sorted(g[1].ChildIds()), [ 3, 4 ])
+        self.assertEqual(sorted(g[1].ParentIds()), [ 3, 4 ])
+        self.assertEqual([ n.nid for n in g[3].Children() ], [ 1 ])
+        self.assertEqual(g[2].ChildIds(), [ 2 ])
+        self.assertEqual(g.ParentIdArray(4).tolist(), [ 1 ])
+
+        ids, weights = g.NeighborWeights(1)
+        self.assertEqual(sorted(zip(ids.tolist(), weights.tolist())), [ (3, 5), (4, 2) ])
+
+    def test_set_weights(self):
+        g = self.graph
+        g.SetWeights([ 4, 0 ], [ 0, 2 ], [ 3, 6 ])
+        self.assertEqual(g.GetWeight(0, 4), 3)
+        self.assertEqual(g.GetWeight(2, 0), 6)
+        self.assertEqual(sorted(g[0].ChildIds()), [ 2, 4 ])
+
+    def test_remove_node(self):
+        g = self.graph
+        g.RemoveNode(3)
+        self.assertEqual(g[1].ChildIds(), [ 4 ])
+
+    def test_adjacency(self):
+        indptr, indices, weights = self.graph.Adjacency()
+        self.assertEqual(indptr.tolist(), [ 0, 0, 2, 3, 4, 5 ])
+        self.assertEqual(sorted(indices[0:2].tolist()), [ 3, 4 ])
+        self.assertEqual(indices[2:].tolist(), [ 2, 1, 1 ])
+        self.assertEqual(weights[2:].tolist(), [ 1, 5, 2 ])
+
+    def test_unchecked(self):
+        u = self.graph.Unchecked()
+        self.assertEqual(u.GetWeight(1, 3), 5)
+        u.SetWeight(4, 0, 1)
+        self.assertEqual(self.graph.GetWeight(0, 4), 1)
+        self.assertEqual(u.GetWeights([ 4, 3 ], [ 1, 1 ]).tolist(), [ 2, 5 ])
+        self.assertEqual(sorted(u.ChildIds(4)), [ 0, 1 ])
+
+class MatrUndirectedTest(_UndirectedTestBase):
+    storage = MatrixStorage
+
+class ListUndirectedTest(_UndirectedTestBase):
+    storage = ListStorage
+
+class CSRUndirectedTest(_UndirectedTestBase):
+    storage = CSRStorage
+
+test_classes = (MatrGraphTest, ListGraphTest, CSRGraphTest, AutoGraphTest,
+        MatrUndirectedTest, ListUndirectedTest, CSRUndirectedTest)
 
 def load_tests(loader, standard_tests, unused):
     suite = TestSuite()
@@ -1,7 +1,14 @@
+import os
+import shutil
+import tempfile
 import unittest
+import numpy as np
 from unittest import TestSuite, TestCase
 from ..graph import Graph
-from ..graphiter import bfsiter, dfsiter
+from ..graphstorage import MatrixStorage, ListStorage, CSRStorage, AutoStorage
+from ..graphiter import bfsiter, dfsiter, bfsiditer, dfsiditer, bfsarrays, \
+        connected_components, strongly_connected_components, toposort, \
+        TraversalIter
 
 class _ShareTestBase(TestCase):
     def setUp(self):
@@ -110,7 +117,257 @@ class DfsTest(_ShareTestBase):
         self.assert_result(val, [ 1, 4, 3, 2 ])
 
 
-test_classes = (BfsTest, DfsTest)
+class IdIterTest(TestCase):
+    def setUp(self):
+        self.graph = Graph(6, True)
+        self.graph.SetWeights([ 1, 1, 3, 2, 4 ], [ 2, 3, 4, 4, 1 ], 1)
+
+    def test_matches_node_iter(self):
+        g = self.graph
+        for start in range(6):
+            self.assertEqual(list(bfsiditer(g, start)), [ n.nid for n in bfsiter(g[start]) ])
+            self.assertEqual(list(dfsiditer(g, start)), [ n.nid for n in dfsiter(g[start]) ])
+
+    def test_yields_ints(self):
+        vals = list(bfsiditer(self.graph, self.graph[1]))
+        self.assertEqual(vals, [ 1, 2, 3, 4 ])
+        self.assertTrue(all(type(v) is int for v in vals))
+
+    def test_invalid_input(self):
+        with self.assertRaises(TypeError):
+            bfsiditer(None, 0)
+        with self.assertRaises(KeyError):
+            bfsiditer(self.graph, 6)
+        self.graph.RemoveNode(2)
+        with self.assertRaises(KeyError):
+            dfsiditer(self.graph, 2)
+
+    def test_undirected(self):
+        graph = Graph(4, False)
+        graph.SetWeight(2, 1, 1)
+        graph.SetWeight(3, 2, 1)
+        self.assertEqual(list(bfsiditer(graph, 3)), [ 3, 2, 1 ])
+
+
+class BfsArraysTest(TestCase):
+    def setUp(self):
+        self.graph = Graph(7, True)
+        self.graph.SetWeights([ 0, 0, 1, 2, 3, 5 ], [ 1, 2, 3, 3, 4, 6 ], 1)
+
+    def test_distances(self):
+        dist, pred = bfsarrays(self.graph, 0)
+        self.assertEqual(dist.tolist(), [ 0, 1, 1, 2, 3, -1, -1 ])
+        self.assertEqual(pred.tolist(), [ -1, 0, 0, 1, 3, -1, -1 ])
+
+    def test_depth_limit(self):
+        dist, pred = bfsarrays(self.graph, 0, maxdepth=1)
+        self.assertEqual(dist.tolist(), [ 0, 1, 1, -1, -1, -1, -1 ])
+
+    def test_multi_source(self):
+        dist, pred = bfsarrays(self.graph, [ 0, 5 ])
+        self.assertEqual(dist.tolist(), [ 0, 1, 1, 2, 3, 0, 1 ])
+        self.assertEqual(pred[6], 5)
+
+    def test_invalid(self):
+        self.graph.RemoveNode(3)
+        with self.assertRaises(KeyError):
+            bfsarrays(self.graph, 3)
+        with self.assertRaises(TypeError):
+            bfsarrays(None, 0)
+        dist, _ = bfsarrays(self.graph, 0)
+        self.assertEqual(dist.tolist(), [ 0, 1, 1, -1, -1, -1, -1 ])
+
+    def test_zeroed_edge(self):
+        for storage in (MatrixStorage, ListStorage, CSRStorage):
+            graph = Graph(3, True, storage=storage)
+            graph.SetWeight(0, 1, 1)
+            graph.SetWeight(0, 1, 0)
+            self.assertEqual(bfsarrays(graph, 0)[0].tolist(), [ 0, -1, -1 ])
+            self.assertEqual(list(bfsiditer(graph, 0)), [ 0 ])
+
+    def test_matches_bfsiter(self):
+        rng = np.random.RandomState(3)
+        for storage in (ListStorage, CSRStorage):
+            for directed in (True, False):
+                graph = Graph(60, directed, storage=storage)
+                graph.SetWeights(rng.randint(0, 60, 150), rng.randint(0, 60, 150), 1)
+                dist, pred = bfsarrays(graph, 7)
+
+                reached = list(bfsiditer(graph, 7))
+                self.assertEqual(sorted(reached), np.flatnonzero(dist >= 0).tolist())
+                self.assertEqual(sorted(dist[reached].tolist()), dist[reached].tolist())
+                for nid in reached[1:]:
+                    self.assertEqual(dist[pred[nid]] + 1, dist[nid])
+                    self.assertNotEqual(graph.GetWeight(pred[nid].item(), nid), 0)
+
+
+class ComponentsTest(TestCase):
+    def test_connected(self):
+        graph = Graph(7, True)
+        graph.SetWeights([ 0, 2, 4, 5 ], [ 1, 1, 5, 6 ], 1)
+        labels = connected_components(graph)
+        self.assertEqual(labels.tolist(), [ 0, 0, 0, 1, 2, 2, 2 ])
+
+    def test_connected_undirected(self):
+        graph = Graph(6, False, storage=ListStorage)
+        graph.SetWeights([ 3, 1 ], [ 0, 5 ], 1)
+        graph.RemoveNode(4)
+        labels = connected_components(graph)
+        self.assertEqual(labels.tolist(), [ 0, 1, 2, 0, -1, 1 ])
+
+    def test_connected_random(self):
+        rng = np.random.RandomState(6)
+        graph = Graph(60, False, storage=CSRStorage)
+        graph.SetWeights(rng.randint(60, size=40), rng.randint(60, size=40), 1)
+        labels = connected_components(graph)
+        for u in range(60):
+            reach = bfsarrays(graph, u)[0] >= 0
+            self.assertEqual((labels == labels[u]).tolist(), reach.tolist())
+        # Numbered in order of each component's smallest id
+        firsts = [ labels.tolist().index(l) for l in range(labels.max() + 1) ]
+        self.assertEqual(firsts, sorted(firsts))
+
+    def test_strong(self):
+        graph = Graph(8, True, storage=CSRStorage)
+        graph.SetWeights([ 0, 1, 2, 2, 3, 4, 5 ], [ 1, 2, 0, 3, 4, 3, 5 ], 1)
+        graph.RemoveNode(6)
+        labels = strongly_connected_components(graph).tolist()
+        self.assertEqual(labels[0], labels[1])
+        self.assertEqual(labels[1], labels[2])
+        self.assertEqual(labels[3], labels[4])
+        self.assertEqual(len(set(labels[:6] + labels[7:])), 4)
+        self.assertEqual(labels[6], -1)
+        # Edges between components go from higher to lower labels
+        self.assertTrue(labels[2] > labels[3])
+
+    def test_strong_random(self):
+        rng = np.random.RandomState(5)
+        graph = Graph(30, True, storage=ListStorage)
+        for _ in range(45):
+            u, v = rng.randint(30, size=2).tolist()
+            graph.SetWeight(u, v, 1)
+        labels = strongly_connected_components(graph)
+        reach = [ bfsarrays(graph, nid)[0] >= 0 for nid in range(30) ]
+        for u in range(30):
+            for v in range(30):
+                same = reach[u][v] and reach[v][u]
+                self.assertEqual(labels[u] == labels[v], same)
+
+    def test_zero_weights(self):
+        # An edge set back to 0 is gone for every routine on every backend
+        for storage in (MatrixStorage, ListStorage, CSRStorage, AutoStorage):
+            graph = Graph(3, True, storage=storage)
+            graph.SetWeights([ 0, 1 ], [ 1, 0 ], 1)
+            graph.SetWeight(1, 0, 0)
+            graph.SetWeight(2, 1, 3)
+            graph.SetWeight(2, 1, 0)
+            self.assertEqual(toposort(graph).tolist(), [ 0, 2, 1 ])
+            self.assertEqual(len(set(strongly_connected_components(graph).tolist())), 3)
+            self.assertEqual(connected_components(graph).tolist(), [ 0, 0, 1 ])
+            self.assertEqual(bfsarrays(graph, 1)[0].tolist(), [ -1, 0, -1 ])
+            self.assertEqual(list(bfsiditer(graph, 2)), [ 2 ])
+            self.assertEqual(graph.Adjacency()[1].tolist(), [ 1 ])
+
+    def test_long_chain(self):
+        N = 20000
+        graph = Graph(N, True, storage=CSRStorage)
+        graph.SetWeights(range(N - 1), range(1, N), 1)
+        graph.SetWeight(N - 1, 0, 1)
+        labels = strongly_connected_components(graph)
+        self.assertEqual(set(labels.tolist()), set([ 0 ]))
+        self.assertEqual(set(connected_components(graph).tolist()), set([ 0 ]))
+
+    def test_invalid(self):
+        with self.assertRaises(TypeError):
+            connected_components(None)
+        with self.assertRaises(TypeError):
+            strongly_connected_components(None)
+
+class ToposortTest(TestCase):
+    def test_order(self):
+        graph = Graph(6, True, storage=ListStorage)
+        graph.SetWeights([ 5, 5, 4, 4, 2, 3 ], [ 2, 0, 0, 1, 3, 1 ], 1)
+        order = toposort(graph).tolist()
+        self.assertEqual(order, [ 4, 5, 0, 2, 3, 1 ])
+
+    def test_cycle(self):
+        graph = Graph(3, True)
+        graph.SetWeights([ 0, 1, 2 ], [ 1, 2, 0 ], 1)
+        with self.assertRaises(ValueError):
+            toposort(graph)
+        graph.SetWeight(2, 0, 0)
+        self.assertEqual(toposort(graph).tolist(), [ 0, 1, 2 ])
+
+    def test_removed(self):
+        graph = Graph(4, True, storage=CSRStorage)
+        graph.SetWeights([ 2, 0 ], [ 0, 3 ], 1)
+        graph.RemoveNode(1)
+        self.assertEqual(toposort(graph).tolist(), [ 2, 0, 3 ])
+
+    def test_invalid(self):
+        with self.assertRaises(TypeError):
+            toposort(None)
+        with self.assertRaises(ValueError):
+            toposort(Graph(3, False))
+
+class TraversalIterTest(TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(9)
+        self.graph = Graph(30, True, storage=ListStorage)
+        self.graph.SetWeights(range(0, 28, 3), range(1, 29, 3), 1)
+        for _ in range(50):
+            u, v = rng.randint(30, size=2).tolist()
+            self.graph.SetWeight(u, v, 1)
+
+    def test_matches_generators(self):
+        for bfs, gen in ((True, bfsiditer), (False, dfsiditer)):
+            it = TraversalIter(self.graph, 0, bfs)
+            self.assertEqual(list(it), list(gen(self.graph, 0)))
+            self.assertEqual(it.count, len(list(gen(self.graph, 0))))
+
+    def test_resume(self):
+        for bfs in (True, False):
+            correct = list(TraversalIter(self.graph, 0, bfs))
+            it = TraversalIter(self.graph, 0, bfs)
+            first = [ next(it) for i in range(5) ]
+            state = it.State()
+            self.assertEqual(state['visited'].dtype, np.uint8)
+            self.assertEqual(len(state['visited']), 4)
+
+            resumed = TraversalIter.Restore(self.graph, state)
+            self.assertEqual(first + list(resumed), correct)
+            self.assertEqual(first + list(it), correct)
+
+    def test_save_load(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'crawl.state')
+            correct = list(bfsiditer(self.graph, 3))
+            it = TraversalIter(self.graph, 3)
+            first = [ next(it) for i in range(3) ]
+            it.Save(path)
+
+            resumed = TraversalIter.Load(self.graph, path)
+            self.assertEqual(resumed.count, 3)
+            self.assertEqual(first + list(resumed), correct)
+
+            self.graph.Save(path)
+            with self.assertRaises(IOError):
+                TraversalIter.Load(self.graph, path)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_invalid(self):
+        with self.assertRaises(TypeError):
+            TraversalIter(None, 0)
+        with self.assertRaises(KeyError):
+            TraversalIter(self.graph, 30)
+        state = TraversalIter(self.graph, 0).State()
+        with self.assertRaises(ValueError):
+            TraversalIter.Restore(Graph(3, True), state)
+
+test_classes = (BfsTest, DfsTest, IdIterTest, BfsArraysTest, \
+        ComponentsTest, ToposortTest, TraversalIterTest)
 
 def load_tests(loader, standard_tests, unused):
     suite = TestSuite()
@@ -0,0 +1,121 @@
+import unittest
+import numpy as np
+from unittest import TestSuite, TestCase
+from ..graph import Graph
+from ..graphstorage import ListStorage, CSRStorage
+from ..graphiter import toposort
+from ..graphorder import TopoOrder
+from .fixtures import GraphFixture
+
+class _TopoOrderTestBase(GraphFixture):
+    def setUp(self):
+        self.graph = self.makeGraph(8)
+        self.topo = TopoOrder(self.graph)
+
+    def assertValid(self):
+        order = self.topo.Order().tolist()
+        rank = dict((nid, i) for i, nid in enumerate(order))
+        src, dst, weights = self.graph.storage.Edges()
+        for u, v, w in zip(src.tolist(), dst.tolist(), weights.tolist()):
+            if w != 0:
+                self.assertTrue(rank[u] < rank[v])
+        return order
+
+    def test_incremental(self):
+        rng = np.random.RandomState(11)
+        for _ in range(60):
+            u, v = rng.randint(8, size=2).tolist()
+            try:
+                self.graph.SetWeight(u, v, 1)
+            except ValueError:
+                self.assertEqual(self.graph.GetWeight(u, v), 0)
+                continue
+            self.assertValid()
+        toposort(self.graph)
+
+    def test_cycle_rejected(self):
+        self.graph.SetWeight(3, 1, 1)
+        self.graph.SetWeight(1, 6, 1)
+        with self.assertRaises(ValueError):
+            self.graph.SetWeight(6, 3, 1)
+        self.assertEqual(self.graph.GetWeight(6, 3), 0)
+        with self.assertRaises(ValueError):
+            self.graph.SetWeight(2, 2, 1)
+
+        # Removing an edge allows the reverse one
+        self.graph.SetWeight(1, 6, 0)
+        self.graph.SetWeight(6, 3, 1)
+        self.assertValid()
+
+    def test_batch(self):
+        with self.assertRaises(ValueError):
+            self.graph.SetWeights([ 0, 1 ], [ 1, 0 ], 1)
+        self.assertEqual(self.graph.GetWeight(0, 1), 0)
+        self.assertEqual(self.graph.GetWeight(1, 0), 0)
+        self.graph.SetWeights([ 7, 6, 5 ], [ 6, 5, 4 ], 1)
+        self.assertValid()
+
+    def test_batch_rejected_midway(self):
+        self.graph.SetWeights([ 2, 3 ], [ 3, 4 ], [ 5, 6 ])
+        before = self.graph.storage.Edges()
+
+        # 2 -> 3 is overwritten and 0 -> 1 added before 4 -> 2 is rejected
+        with self.assertRaises(ValueError):
+            self.graph.SetWeights([ 2, 0, 4, 5 ], [ 3, 1, 2, 6 ], [ 9, 1, 1, 1 ])
+        self.assertEqual(self.graph.GetWeight(2, 3), 5)
+        self.assertEqual(self.graph.GetWeight(0, 1), 0)
+        self.assertEqual(self.graph.GetWeight(5, 6), 0)
+        after = self.graph.storage.Edges()
+        for a, b in zip(before, after):
+            self.assertEqual(a.tolist(), b.tolist())
+
+        self.assertValid()
+        self.graph.SetWeights([ 0, 5 ], [ 1, 6 ], 1)
+        self.assertValid()
+
+    def test_nodes(self):
+        self.graph.SetWeights([ 0, 2 ], [ 2, 5 ], 1)
+        self.graph.RemoveNode(2)
+        self.graph.RemoveNode(7)
+        self.assertEqual(len(self.assertValid()), 6)
+        self.graph.AddNodes(3)
+        self.graph.SetWeights([ 8, 5, 2 ], [ 0, 8, 1 ], 1)
+        self.assertEqual(len(self.assertValid()), 9)
+
+        self.graph.RemoveNode(3)
+        mapping = self.graph.Compact()
+        order = self.assertValid()
+        self.assertEqual(sorted(order), list(range(8)))
+        self.assertTrue(order.index(mapping[5]) < order.index(mapping[8]))
+
+    def test_detach(self):
+        self.topo.Detach()
+        self.graph.SetWeights([ 0, 1 ], [ 1, 0 ], 1)
+        self.assertEqual(self.graph.listeners, [])
+
+    def test_invalid(self):
+        with self.assertRaises(TypeError):
+            TopoOrder(None)
+        with self.assertRaises(ValueError):
+            TopoOrder(Graph(3, False))
+
+class MatrTopoOrderTest(_TopoOrderTestBase, TestCase):
+    pass
+
+class ListTopoOrderTest(_TopoOrderTestBase, TestCase):
+    storage = ListStorage
+
+class CSRTopoOrderTest(_TopoOrderTestBase, TestCase):
+    storage = CSRStorage
+
+test_classes = (MatrTopoOrderTest, ListTopoOrderTest, CSRTopoOrderTest)
+
+def load_tests(loader, standard_tests, unused):
+    suite = TestSuite()
+    for c in test_classes:
+        tests = loader.loadTestsFromTestCase(c)
+        suite.addTest(tests)
+    return suite
+
+if __name__ == "__main__":
+    unittest.main()
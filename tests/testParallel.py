@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+from unittest import TestSuite, TestCase
+from ..graph import Graph
+from ..graphstorage import ListStorage
+from ..graphiter import bfsarrays
+from ..graphparallel import bfsmany
+
+class BfsManyTest(TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(7)
+        self.graph = Graph(40, True, storage=ListStorage)
+        for _ in range(60):
+            u, v = rng.randint(40, size=2).tolist()
+            self.graph.SetWeight(u, v, 1)
+
+    def test_distances(self):
+        results = dict(bfsmany(self.graph, range(40), processes=2, chunksize=3))
+        self.assertEqual(sorted(results), list(range(40)))
+        for nid, dist in results.items():
+            correct, _ = bfsarrays(self.graph, [ nid ])
+            self.assertEqual(dist.tolist(), correct.tolist())
+
+    def test_reach(self):
+        results = list(bfsmany(self.graph, [ 3, 3, 9 ], processes=2,
+                maxdepth=2, reach=True))
+        self.assertEqual(sorted(r[0] for r in results), [ 3, 3, 9 ])
+        for nid, ids in results:
+            correct, _ = bfsarrays(self.graph, [ nid ], maxdepth=2)
+            self.assertEqual(ids.tolist(), np.flatnonzero(correct >= 0).tolist())
+
+    def test_early_exit(self):
+        gen = bfsmany(self.graph, range(40), processes=2, chunksize=1)
+        nid, _ = next(gen)
+        self.assertTrue(0 <= nid < 40)
+        gen.close()
+
+    def test_zeroed_edge(self):
+        graph = Graph(3, True, storage=ListStorage)
+        graph.SetWeight(0, 1, 1)
+        graph.SetWeight(0, 1, 0)
+        (nid, dist), = bfsmany(graph, [ 0 ], processes=1)
+        self.assertEqual(dist.tolist(), [ 0, -1, -1 ])
+
+    def test_invalid_input(self):
+        # Checked on the call, before any result is requested
+        with self.assertRaises(TypeError):
+            bfsmany(None, [ 0 ])
+        self.graph.RemoveNode(5)
+        with self.assertRaises(KeyError):
+            bfsmany(self.graph, [ 5 ])
+
+test_classes = (BfsManyTest,)
+
+def load_tests(loader, standard_tests, unused):
+    suite = TestSuite()
+    for c in test_classes:
+        tests = loader.loadTestsFromTestCase(c)
+        suite.addTest(tests)
+    return suite
+
+if __name__ == "__main__":
+    unittest.main()
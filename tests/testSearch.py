@@ -0,0 +1,180 @@
+import unittest
+import numpy as np
+from unittest import TestSuite, TestCase
+from ..graphstorage import ListStorage, CSRStorage
+from ..graphsearch import dijkstra, astar, bidijkstra, floydwarshall, \
+        hoppath, pathto
+from .fixtures import GraphFixture
+
+def _bellmanford(graph, source):
+    N = graph.storage.N
+    dist = [ float('inf') ] * N
+    dist[source] = 0
+    for _ in range(N):
+        for u in range(N):
+            for v in range(N):
+                w = graph.GetWeight(u, v)
+                if w and dist[u] + w < dist[v]:
+                    dist[v] = dist[u] + w
+    return dist
+
+class _SearchTestBase(GraphFixture):
+    def randomGraph(self, N, seed):
+        rng = np.random.RandomState(seed)
+        graph = self.makeGraph(N)
+        for _ in range(N * 3):
+            u, v = rng.randint(N, size=2).tolist()
+            graph.SetWeight(u, v, int(rng.randint(1, 10)))
+        return graph
+
+    def test_dijkstra_line(self):
+        graph = self.makeGraph(5)
+        graph.SetWeight(0, 1, 2)
+        graph.SetWeight(1, 2, 3)
+        graph.SetWeight(0, 2, 10)
+        dist, pred = dijkstra(graph, 0)
+        self.assertEqual(dist.tolist()[:3], [0, 2, 5])
+        self.assertTrue(np.isinf(dist[3:]).all())
+        self.assertEqual(pathto(pred, 2), [0, 1, 2])
+        self.assertEqual(pred[4], -1)
+
+    def test_dijkstra_random(self):
+        for seed in range(5):
+            graph = self.randomGraph(12, seed)
+            dist, _ = dijkstra(graph, 0)
+            self.assertEqual(dist.tolist(), _bellmanford(graph, 0))
+
+    def test_dijkstra_target(self):
+        graph = self.randomGraph(12, 3)
+        full, _ = dijkstra(graph, 0)
+        for t in range(12):
+            dist, pred = dijkstra(graph, 0, t)
+            self.assertEqual(dist[t], full[t])
+            if not np.isinf(dist[t]):
+                self.assertEqual(pathto(pred, t)[0], 0)
+
+    def test_astar(self):
+        for seed in range(5):
+            graph = self.randomGraph(12, seed)
+            dist, _ = dijkstra(graph, 0)
+            for t in range(12):
+                cost, path = astar(graph, 0, t, lambda n: 0)
+                self.assertEqual(cost, dist[t])
+                if np.isinf(cost):
+                    self.assertEqual(path, [])
+                else:
+                    self.assertEqual(path[0], 0)
+                    self.assertEqual(path[-1], t)
+                    self.assertEqual(self.pathCost(graph, path), cost)
+
+    def test_astar_inconsistent(self):
+        graph = self.makeGraph(4)
+        graph.SetWeights([ 0, 1, 0, 2 ], [ 1, 2, 2, 3 ], [ 1, 1, 3, 10 ])
+        cost, path = astar(graph, 0, 3, lambda n: 10 if n == 1 else 0)
+        self.assertEqual(cost, 12)
+        self.assertEqual(path, [ 0, 1, 2, 3 ])
+
+    def test_astar_grid(self):
+        side = 6
+        graph = self.makeGraph(side * side)
+        for r in range(side):
+            for c in range(side):
+                n = r * side + c
+                if c + 1 < side:
+                    graph.SetWeight(n, n + 1, 1)
+                if r + 1 < side:
+                    graph.SetWeight(n, n + side, 1)
+        goal = side * side - 1
+        manhattan = lambda n: (side - 1 - n // side) + (side - 1 - n % side)
+        cost, path = astar(graph, 0, goal, manhattan)
+        self.assertEqual(cost, 2 * (side - 1))
+        self.assertEqual(len(path), 2 * side - 1)
+
+    def test_bidijkstra(self):
+        for seed in range(5):
+            graph = self.randomGraph(12, seed)
+            adj, rev = graph.Adjacency(), graph.Adjacency(reverse=True)
+            for s in range(12):
+                dist, _ = dijkstra(graph, s, adjacency=adj)
+                for t in range(12):
+                    cost, path = bidijkstra(graph, s, t, adj, rev)
+                    self.assertEqual(cost, dist[t])
+                    if np.isinf(cost):
+                        self.assertEqual(path, [])
+                    else:
+                        self.assertEqual((path[0], path[-1]), (s, t))
+                        self.assertEqual(self.pathCost(graph, path), cost)
+
+    def test_floydwarshall(self):
+        for seed in range(3):
+            graph = self.randomGraph(12, seed)
+            dist, nexthop = floydwarshall(graph)
+            for s in range(12):
+                single, _ = dijkstra(graph, s)
+                self.assertEqual(dist[s].tolist(), single.tolist())
+                for t in range(12):
+                    path = hoppath(nexthop, s, t)
+                    if np.isinf(dist[s, t]):
+                        self.assertEqual(path, [])
+                    else:
+                        self.assertEqual((path[0], path[-1]), (s, t))
+                        self.assertEqual(self.pathCost(graph, path), dist[s, t])
+
+    def test_floydwarshall_negative(self):
+        graph = self.makeGraph(3)
+        graph.SetWeight(0, 1, 4)
+        graph.SetWeight(1, 2, -2)
+        if self.directed:
+            graph.SetWeight(0, 2, 3)
+            dist, nexthop = floydwarshall(graph)
+            self.assertEqual(dist[0, 2], 2)
+            self.assertEqual(hoppath(nexthop, 0, 2), [0, 1, 2])
+            graph.SetWeight(2, 0, -3)
+        with self.assertRaises(ValueError):
+            floydwarshall(graph)
+
+    def test_negative_weights(self):
+        graph = self.makeGraph(3)
+        graph.SetWeight(0, 1, -1)
+        with self.assertRaises(ValueError):
+            dijkstra(graph, 0)
+        with self.assertRaises(ValueError):
+            bidijkstra(graph, 0, 1)
+
+    def test_invalid_input(self):
+        graph = self.makeGraph(3)
+        with self.assertRaises(TypeError):
+            dijkstra(None, 0)
+        with self.assertRaises(KeyError):
+            dijkstra(graph, 3)
+        graph.RemoveNode(1)
+        with self.assertRaises(KeyError):
+            astar(graph, 0, 1, lambda n: 0)
+
+    def pathCost(self, graph, path):
+        return sum(graph.GetWeight(u, v) for u, v in zip(path, path[1:]))
+
+class MatrSearchTest(_SearchTestBase, TestCase):
+    pass
+
+class ListSearchTest(_SearchTestBase, TestCase):
+    storage = ListStorage
+
+class CSRSearchTest(_SearchTestBase, TestCase):
+    storage = CSRStorage
+
+class UndirectedSearchTest(_SearchTestBase, TestCase):
+    directed = False
+
+test_classes = (MatrSearchTest, ListSearchTest, CSRSearchTest,
+        UndirectedSearchTest)
+
+def load_tests(loader, standard_tests, unused):
+    suite = TestSuite()
+    for c in test_classes:
+        tests = loader.loadTestsFromTestCase(c)
+        suite.addTest(tests)
+    return suite
+
+if __name__ == "__main__":
+    unittest.main()
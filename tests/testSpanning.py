@@ -0,0 +1,120 @@
+import unittest
+import numpy as np
+from unittest import TestSuite, TestCase
+from ..graphstorage import ListStorage, CSRStorage
+from ..graphiter import connected_components
+from ..unionfind import UnionFind
+from ..spanning import kruskal, prim, spanningtree
+from .fixtures import GraphFixture
+
+class UnionFindTest(TestCase):
+    def test_union(self):
+        sets = UnionFind(6)
+        self.assertTrue(sets.Union(0, 1))
+        self.assertTrue(sets.Union(2, 3))
+        self.assertTrue(sets.Union(1, 3))
+        self.assertFalse(sets.Union(0, 2))
+        self.assertTrue(sets.Connected(0, 3))
+        self.assertFalse(sets.Connected(0, 4))
+        self.assertEqual(sets.sets, 3)
+
+        labels = sets.Labels().tolist()
+        self.assertEqual(len(set(labels[:4])), 1)
+        self.assertEqual(labels[4:], [ 4, 5 ])
+
+    def test_add(self):
+        sets = UnionFind(0)
+        self.assertEqual(sets.Add(3), 0)
+        self.assertEqual(sets.Add(), 3)
+        sets.Union(3, 1)
+        self.assertEqual(len(sets), 4)
+        self.assertEqual(sets.sets, 3)
+        self.assertTrue(sets.Connected(1, 3))
+
+    def test_compression(self):
+        sets = UnionFind(1000)
+        for i in range(999):
+            sets.Union(i, i + 1)
+        root = sets.Find(0)
+        self.assertEqual(sets.parent[0], root)
+        self.assertTrue(max(sets.rank) < 11)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            UnionFind(-1)
+
+class _SpanningTestBase(GraphFixture):
+    directed = False
+
+    def test_known(self):
+        graph = self.makeGraph(5)
+        graph.SetWeights([ 0, 0, 1, 1, 2, 3 ], [ 1, 2, 2, 3, 4, 4 ],
+                [ 4, 1, 2, 5, 8, 3 ])
+        for edges in (kruskal(graph), prim(graph)):
+            self.assertEqual(len(edges[0]), 4)
+            self.assertEqual(edges[2].sum(), 11)
+            pairs = set(tuple(sorted(p)) for p in zip(edges[0].tolist(), edges[1].tolist()))
+            self.assertEqual(pairs, set([ (0, 2), (1, 2), (1, 3), (3, 4) ]))
+
+    def test_random_forest(self):
+        rng = np.random.RandomState(8)
+        for seed in range(4):
+            graph = self.makeGraph(20)
+            for _ in range(25):
+                u, v = rng.randint(20, size=2).tolist()
+                graph.SetWeight(u, v, int(rng.randint(1, 20)))
+            labels = connected_components(graph)
+            trees = len(set(labels.tolist()))
+            k, p = kruskal(graph), prim(graph)
+            self.assertEqual(len(k[0]), 20 - trees)
+            self.assertEqual(len(p[0]), 20 - trees)
+            self.assertEqual(k[2].sum(), p[2].sum())
+            for src, dst, weights in (k, p):
+                self.assertTrue((labels[src] == labels[dst]).all())
+                for u, v, w in zip(src.tolist(), dst.tolist(), weights.tolist()):
+                    self.assertTrue(w in (graph.GetWeight(u, v), graph.GetWeight(v, u)))
+
+    def test_tree(self):
+        graph = self.makeGraph(5)
+        graph.SetWeights([ 0, 1, 1 ], [ 1, 2, 3 ], [ 2, 3, 4 ])
+        graph.RemoveNode(4)
+        root = spanningtree(graph, prim(graph, root=1), 1)
+        self.assertTrue(root.IsRoot())
+        self.assertEqual(sorted(child.nid for child in root.AllChildren()), [ 0, 2, 3 ])
+        self.assertTrue(all(child.IsLeaf() for child in root.AllChildren()))
+        self.assertEqual(root.GetChild(0).Parent().nid, 1)
+
+    def test_invalid(self):
+        with self.assertRaises(TypeError):
+            kruskal(None)
+        with self.assertRaises(TypeError):
+            prim(None)
+        graph = self.makeGraph(3)
+        graph.RemoveNode(1)
+        with self.assertRaises(KeyError):
+            prim(graph, root=1)
+
+class MatrSpanningTest(_SpanningTestBase, TestCase):
+    pass
+
+class ListSpanningTest(_SpanningTestBase, TestCase):
+    storage = ListStorage
+
+class CSRSpanningTest(_SpanningTestBase, TestCase):
+    storage = CSRStorage
+
+class DirectedSpanningTest(_SpanningTestBase, TestCase):
+    directed = True
+
+test_classes = (UnionFindTest, MatrSpanningTest, ListSpanningTest,
+        CSRSpanningTest, DirectedSpanningTest)
+
+def load_tests(loader, standard_tests, unused):
+    suite = TestSuite()
+    for c in test_classes:
+        tests = loader.loadTestsFromTestCase(c)
+        suite.addTest(tests)
+    return suite
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,11 @@
+import os
+import shutil
+import tempfile
 import unittest
+import numpy as np
 from unittest import TestSuite, TestCase
-from ..graphstorage import MatrixStorage, ListStorage
+from ..graphstorage import MatrixStorage, ListStorage, CSRStorage, BitMatrixStorage, \
+        MemmapMatrixStorage, AutoStorage
 
 class _StorageTestBase(TestCase):
     def setUp(self):
@@ -66,6 +71,28 @@ class _StorageTestBase(TestCase):
         self.assert_access_eq(1,nid,0)
         self.assert_access_eq(nid,1,0)
 
+    def test_addnodes(self):
+        self.storage[4,0] = 2
+        self.storage.AddNodes(3)
+
+        self.assertEqual(len(self.storage), 8)
+        self.assert_access_eq(4,0,2)
+        self.assert_access_eq(7,0,0)
+        self.assert_access_eq(0,7,0)
+
+        self.storage[7,6] = 3
+        self.assert_access_eq(7,6,3)
+
+    def test_remove_then_addnodes(self):
+        self.storage[3,4] = 2
+        self.storage[4,3] = 2
+        self.storage.Remove()
+        self.storage.AddNodes(2)
+
+        self.assert_access_eq(3,4,0)
+        self.assert_access_eq(4,3,0)
+        self.assert_access_eq(5,3,0)
+
     def test_out_of_range(self):
         self.assert_access_fail(-1,0)
         self.assert_access_fail(0,-1)
@@ -139,6 +166,90 @@ class _StorageTestBase(TestCase):
         self.assertIsNotNone(z)
         self.assertEqual(z, [])
 
+    def test_id_arrays(self):
+        s = self.storage
+        s[0,3] = 2
+        s[4,3] = 5
+
+        self.assertEqual(sorted(s.ChildIdArray(0).tolist()), [ 1, 3 ])
+        self.assertEqual(sorted(s.ParentIdArray(3).tolist()), [ 0, 4 ])
+        self.assertEqual(s.ChildIdArray(2).tolist(), [])
+        self.assertEqual(s.ParentIdArray(2).tolist(), [])
+
+        ids, weights = s.NeighborWeights(0)
+        self.assertEqual(sorted(zip(ids.tolist(), weights.tolist())), [ (1, 3), (3, 2) ])
+
+        with self.assertRaises(KeyError):
+            s.ChildIdArray(5)
+        with self.assertRaises(KeyError):
+            s.NeighborWeights(-1)
+
+    def test_set_many(self):
+        s = self.storage
+        s.SetMany([ 1, 2, 4, 0 ], [ 2, 3, 0, 1 ], [ 5, 6, 7, 0 ])
+
+        self.assert_access_eq(1,2,5)
+        self.assert_access_eq(2,3,6)
+        self.assert_access_eq(4,0,7)
+        self.assert_access_eq(0,1,0)
+        self.assertEqual(list(s.Children(2)), [ 3 ])
+        self.assertEqual(list(s.Parents(3)), [ 2 ])
+
+        vals = s.GetMany(np.array([ 1, 2, 3 ]), np.array([ 2, 3, 3 ]))
+        self.assertEqual(vals.tolist(), [ 5, 6, 0 ])
+
+    def test_set_many_scalar(self):
+        self.storage.SetMany(np.array([ 1, 1, 2 ]), np.array([ 3, 4, 3 ]), 2)
+        self.assertEqual(self.storage.GetMany([ 1, 1, 2 ], [ 3, 4, 3 ]).tolist(), [ 2, 2, 2 ])
+
+    def test_set_many_last_wins(self):
+        self.storage.SetMany([ 3, 3, 3 ], [ 4, 4, 4 ], [ 1, 2, 9 ])
+        self.assert_access_eq(3,4,9)
+
+    def test_many_out_of_range(self):
+        with self.assertRaises(KeyError):
+            self.storage.SetMany([ 0, 5 ], [ 1, 1 ], 1)
+        with self.assertRaises(KeyError):
+            self.storage.GetMany([ 0, 1 ], [ -1, 1 ])
+        with self.assertRaises(TypeError):
+            self.storage.GetMany([ 0.5 ], [ 1 ])
+        self.assert_access_eq(0,1,3)
+
+    def test_edges(self):
+        s = self.storage
+        s[4,2] = 5
+        s[2,3] = 2
+        edges = sorted(zip(*[ a.tolist() for a in s.Edges() ]))
+        self.assertEqual(edges, [ (0, 1, 3), (2, 3, 2), (4, 2, 5) ])
+
+    def test_convert(self):
+        self.storage[4,2] = 5
+        for cls in (MatrixStorage, ListStorage, CSRStorage):
+            other = self.storage.ConvertTo(cls)
+            self.assertIsInstance(other, cls)
+            self.assertEqual(len(other), 5)
+            self.assertEqual(other[0,1], 3)
+            self.assertEqual(other[4,2], 5)
+            self.assertEqual(list(other.Parents(2)), [ 4 ])
+
+    def test_compact(self):
+        s = self.storage
+        s[4,2] = 5
+        s[2,3] = 2
+        s[3,4] = 1
+        s.Compact(np.array([ 0, 1, 2, 4 ]))
+
+        self.assertEqual(len(s), 4)
+        self.assert_access_eq(0,1,3)
+        self.assert_access_eq(3,2,5)
+        self.assertEqual(list(s.Children(2)), [])
+        self.assertEqual(list(s.Parents(2)), [ 3 ])
+        self.assert_access_fail(0,4)
+
+        s.AddNode()
+        self.assert_access_eq(3,4,0)
+        self.assert_access_eq(4,3,0)
+
     def test_remove_children(self):
         self.storage[3,4] = 5
         self.storage.Remove()
@@ -168,11 +279,348 @@ class MatrixTest(_StorageTestBase):
     def create(self, *args, **kwargs):
         return MatrixStorage(*args, **kwargs)
 
+    def test_capacity_growth(self):
+        s = self.storage
+        for i in range(20):
+            s.AddNode()
+        self.assertEqual(len(s), 25)
+        self.assertLess(s._buf.shape[0], 2 * 25)
+        self.assert_access_eq(0,1,3)
+
+    def test_capacity_shrink(self):
+        s = self.storage
+        s.AddNodes(95)
+        for i in range(90):
+            s.Remove()
+        self.assertEqual(len(s), 10)
+        self.assertLessEqual(s._buf.shape[0], 40)
+        self.assert_access_eq(0,1,3)
+
+    def test_dtype(self):
+        s = self.create(5, dtype=np.int8)
+        s[1,2] = 7
+        self.assertEqual(s.matr.dtype, np.int8)
+        self.assertEqual(s[1,2], 7)
+
+        s.AddNodes(4)
+        s[8,1] = -3
+        self.assertEqual(s.matr.dtype, np.int8)
+        self.assertEqual(s[8,1], -3)
+        self.assertEqual(s[1,2], 7)
+
 class ListTest(_StorageTestBase):
     def create(self, *args, **kwargs):
         return ListStorage(*args, **kwargs)
 
-test_classes = (MatrixTest, ListTest)
+    def test_zero_weight_not_stored(self):
+        s = self.storage
+        s[2,3] = 1
+        s[2,3] = 0
+        s.SetMany([ 4, 4 ], [ 1, 1 ], [ 2, 0 ])
+        s[3,0] = 0
+        self.assertEqual(list(s.Children(2)), [])
+        self.assertEqual(list(s.Parents(3)), [])
+        self.assertEqual(list(s.Parents(1)), [ 0 ])
+        self.assertEqual(s.Edges()[0].tolist(), [ 0 ])
+
+    def test_parent_index(self):
+        s = self.storage
+        s[2,3] = 1
+        s[4,3] = 1
+        s[3,3] = 1
+        self.assertEqual(sorted(s.Parents(3)), [ 2, 3, 4 ])
+
+        s.Zero(3)
+        self.assertEqual(list(s.Parents(3)), [])
+        self.assertEqual(list(s.Children(2)), [])
+        self.assertEqual(list(s.Parents(1)), [ 0 ])
+
+        s[4,1] = 2
+        s.Remove()
+        self.assertEqual(list(s.Parents(1)), [ 0 ])
+
+class CSRTest(_StorageTestBase):
+    def create(self, *args, **kwargs):
+        return CSRStorage(*args, **kwargs)
+
+    def test_children_sorted(self):
+        self.storage[2,4] = 1
+        self.storage[2,0] = 1
+        self.storage[2,3] = 1
+        self.assertEqual(list(self.storage.Children(2)), [ 0, 3, 4 ])
+        self.assertEqual(list(self.storage.Parents(3)), [ 2 ])
+
+    def test_reads_merge_pending(self):
+        self.storage.SetMany([ 0, 1, 2 ], [ 1, 2, 3 ], [ 1, 2, 3 ])
+        self.storage[2,0] = 4
+        self.storage[4,2] = 5
+        self.storage[1,2] = 7
+        self.storage[0,1] = 0
+        self.assertEqual(self.storage.ChildIdArray(2).tolist(), [ 0, 3 ])
+        self.assertEqual(self.storage.NeighborWeights(2)[1].tolist(), [ 4, 3 ])
+        self.assertEqual(self.storage.ParentIdArray(2).tolist(), [ 1, 4 ])
+        self.assertEqual(self.storage.GetMany([ 2, 4, 0 ], [ 0, 2, 1 ]).tolist(),
+                [ 4, 5, 0 ])
+        # Single-node reads leave the new edges buffered
+        self.assertEqual(self.storage._npending, 2)
+
+        self.storage.Zero(2)
+        self.assertEqual(self.storage._npending, 0)
+        self.assertEqual(self.storage.ParentIdArray(2).tolist(), [])
+        self.assertEqual(self.storage.ChildIdArray(4).tolist(), [])
+
+    def test_remove_then_batch(self):
+        self.storage[0,4] = 1
+        self.storage[1,0] = 7
+        self.storage.Edges()
+        self.storage.Remove()
+        self.assertEqual(self.storage.GetMany([ 1 ], [ 0 ]).tolist(), [ 7 ])
+        self.storage.SetMany([ 1 ], [ 0 ], [ 9 ])
+        self.assertEqual(self.storage[1,0], 9)
+        src, dst, weights = self.storage.Edges()
+        self.assertEqual(list(zip(src.tolist(), dst.tolist(), weights.tolist())),
+                [ (0, 1, 3), (1, 0, 9) ])
+
+    def test_remove_drops_entries(self):
+        self.storage.SetMany([ 4, 2, 4 ], [ 2, 4, 4 ], [ 5, 6, 7 ])
+        self.storage[3,2] = 8
+        self.storage.Edges()
+        self.storage.Remove()
+        self.assertEqual(len(self.storage.indices), 2)
+        self.assertTrue((self.storage.indices < 4).all())
+        self.assertEqual(self.storage.ParentIdArray(2).tolist(), [ 3 ])
+        self.assertEqual(self.storage.ChildIdArray(0).tolist(), [ 1 ])
+
+        self.storage.AddNode()
+        self.assertEqual(self.storage[2,4], 0)
+        self.assertEqual(self.storage.ParentIdArray(4).tolist(), [])
+        self.storage[2,4] = 1
+        self.assertEqual(self.storage.ParentIdArray(4).tolist(), [ 2 ])
+
+    def test_pending_limit(self):
+        N = 3 * CSRStorage._flushMin
+        self.storage.AddNodes(N)
+        for nid in range(N):
+            self.storage[nid, nid + 1] = 1
+            self.assertTrue(self.storage._npending <= CSRStorage._flushMin)
+        self.assertEqual(len(self.storage.Edges()[0]), N)
+        self.assertEqual(self.storage.ChildIdArray(N - 1).tolist(), [ N ])
+
+    def test_set_after_flush(self):
+        self.storage[2,3] = 1
+        _ = list(self.storage.Children(2))
+        self.storage[2,3] = 6
+        self.storage[4,3] = 2
+        self.assert_access_eq(2,3,6)
+        self.assert_access_eq(4,3,2)
+        self.assertEqual(list(self.storage.Parents(3)), [ 2, 4 ])
+
+    def test_unset_edge(self):
+        self.storage[2,3] = 1
+        _ = list(self.storage.Children(2))
+        self.storage[2,3] = 0
+        self.assertEqual(list(self.storage.Children(2)), [])
+        self.assertEqual(list(self.storage.Parents(3)), [])
+
+    def test_remove_then_add(self):
+        self.storage[4,0] = 1
+        self.storage[0,4] = 1
+        _ = list(self.storage.Children(0))
+        self.storage.Remove()
+        self.storage.AddNode()
+        self.assert_access_eq(4,0,0)
+        self.assert_access_eq(0,4,0)
+        self.assertEqual(list(self.storage.Children(0)), [ 1 ])
+
+class MemmapMatrixTest(_StorageTestBase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "graph.bin")
+        super(MemmapMatrixTest, self).setUp()
+
+    def tearDown(self):
+        self.storage = None
+        shutil.rmtree(self.dir)
+
+    def create(self, *args, **kwargs):
+        return MemmapMatrixStorage(*args, path=self.path, chunk=4, **kwargs)
+
+    def test_reopen(self):
+        s = self.storage
+        s.AddNodes(6)
+        s[9,10] = 4
+        s.Flush()
+
+        other = MemmapMatrixStorage.Open(self.path)
+        self.assertEqual(len(other), 11)
+        self.assertEqual(other[0,1], 3)
+        self.assertEqual(other[9,10], 4)
+        self.assertEqual(list(other.Parents(10)), [ 9 ])
+
+    def test_read_only(self):
+        self.storage.Flush()
+        other = MemmapMatrixStorage(5, self.path, mode='r')
+        self.assertEqual(other[0,1], 3)
+        with self.assertRaises(IOError):
+            other.AddNode()
+        with self.assertRaises(IOError):
+            other[0,2] = 1
+        with self.assertRaises(IOError):
+            other._Set(0, 2, 1)
+        with self.assertRaises(IOError):
+            other.SetMany([ 0 ], [ 2 ], [ 1 ])
+        with self.assertRaises(IOError):
+            other._SetMany(np.array([ 0 ]), np.array([ 2 ]), np.array([ 1 ]))
+        with self.assertRaises(IOError):
+            other.Zero(0)
+        with self.assertRaises(IOError):
+            other.Compact([ 0, 1 ])
+        self.assertEqual(other[0,1], 3)
+        with self.assertRaises(ValueError):
+            MemmapMatrixStorage(4, self.path, mode='r')
+
+    def test_file_growth(self):
+        s = self.storage
+        self.assertEqual(s._buf.shape[0], 8)
+        s.AddNodes(4)
+        self.assertEqual(s._buf.shape[0], 16)
+        s[8,2] = 5
+
+        for i in range(6):
+            s.Remove()
+        self.assertEqual(s._buf.shape[0], 8)
+        self.assertEqual(s[0,1], 3)
+        self.assertEqual(os.path.getsize(self.path),
+                MemmapMatrixStorage._headerSize + 8 * 8 * 8)
+
+class AutoTest(_StorageTestBase):
+    def create(self, *args, **kwargs):
+        return AutoStorage(*args, **kwargs)
+
+    def test_densify(self):
+        s = AutoStorage(10, denseAt=0.1, sparseAt=0.05)
+        self.assertFalse(s.IsDense())
+        for i in range(10):
+            s[i, (i + 1) % 10] = 1
+        self.assertFalse(s.IsDense())
+        s[0,5] = 2
+        self.assertTrue(s.IsDense())
+        self.assertIsInstance(s.inner, MatrixStorage)
+        self.assertEqual(s.nnz, 11)
+        self.assertEqual(s[0,5], 2)
+        self.assertEqual(list(s.Children(0)), [ 1, 5 ])
+
+    def test_sparsify(self):
+        s = AutoStorage(10, denseAt=0.1, sparseAt=0.05)
+        s.SetMany(np.arange(10), np.arange(10)[::-1], 1)
+        s.SetMany([ 0, 1 ], [ 0, 1 ], 1)
+        self.assertTrue(s.IsDense())
+
+        s.Zero(9)
+        s.Zero(0)
+        self.assertEqual(s.nnz, 9)
+        self.assertTrue(s.IsDense())
+        s[1,1] = 0
+        s.SetMany([ 2, 3, 4, 5 ], [ 7, 6, 5, 4 ], [ 0, 0, 0, 0 ])
+        self.assertEqual(s.nnz, 4)
+        self.assertFalse(s.IsDense())
+        self.assertEqual(s[6,3], 1)
+        self.assertEqual(list(s.Parents(3)), [ 6 ])
+
+    def test_grow_sparsifies(self):
+        s = AutoStorage(2)
+        s[0,1] = 1
+        self.assertTrue(s.IsDense())
+        s.AddNodes(10)
+        self.assertFalse(s.IsDense())
+        self.assertEqual(s[0,1], 1)
+
+class BitMatrixTest(TestCase):
+    def setUp(self):
+        self.storage = BitMatrixStorage(11)
+        self.storage.Set(0, 1, 3)
+
+    def test_get_set(self):
+        s = self.storage
+        self.assertEqual(s[0,1], 1)
+        self.assertEqual(s[1,0], 0)
+        s[9,10] = 1
+        s[10,9] = 0.5
+        self.assertEqual(s[9,10], 1)
+        self.assertEqual(s[10,9], 1)
+        s[9,10] = 0
+        self.assertEqual(s[9,10], 0)
+        self.assertEqual(s.bits.nbytes, 11 * 2)
+
+    def test_out_of_range(self):
+        with self.assertRaises(KeyError):
+            self.storage.Get(0, 11)
+        with self.assertRaises(KeyError):
+            self.storage.Set(-1, 0, 1)
+
+    def test_neighbors(self):
+        s = self.storage
+        s[0,8] = 1
+        s[3,8] = 1
+        self.assertEqual(list(s.Children(0)), [ 1, 8 ])
+        self.assertEqual(list(s.Parents(8)), [ 0, 3 ])
+        ids, weights = s.NeighborWeights(0)
+        self.assertEqual(ids.tolist(), [ 1, 8 ])
+        self.assertEqual(weights.tolist(), [ 1, 1 ])
+
+    def test_zero(self):
+        s = self.storage
+        s[3,1] = 1
+        s[1,4] = 1
+        s.Zero(1)
+        self.assertEqual(list(s.Parents(1)), [])
+        self.assertEqual(list(s.Children(1)), [])
+        self.assertEqual(list(s.Children(3)), [])
+
+    def test_remove_add(self):
+        s = self.storage
+        s[10,2] = 1
+        s[2,10] = 1
+        s[2,9] = 1
+        s.Remove()
+        self.assertEqual(len(s), 10)
+        s.AddNodes(7)
+        self.assertEqual(len(s), 17)
+        self.assertEqual(s[10,2], 0)
+        self.assertEqual(s[2,10], 0)
+        self.assertEqual(s[2,9], 1)
+        self.assertEqual(list(s.Children(2)), [ 9 ])
+
+    def test_set_many(self):
+        s = self.storage
+        s.SetMany([ 0, 2, 2, 9 ], [ 1, 8, 9, 9 ], [ 0, 1, 4, 1 ])
+        self.assertEqual(s.GetMany([ 0, 2, 2, 9, 3 ], [ 1, 8, 9, 9, 3 ]).tolist(),
+                [ 0, 1, 1, 1, 0 ])
+        self.assertEqual(list(s.Children(2)), [ 8, 9 ])
+
+    def test_compact(self):
+        s = self.storage
+        s[10,9] = 1
+        s[9,0] = 1
+        s.Compact([ 0, 1, 9, 10 ])
+        self.assertEqual(len(s), 4)
+        self.assertEqual(s.bits.shape, (4, 1))
+        self.assertEqual(sorted(zip(*[ a.tolist() for a in s.Edges()[:2] ])),
+                [ (0, 1), (2, 0), (3, 2) ])
+
+    def test_shrink(self):
+        s = self.storage
+        s.AddNodes(40)
+        for i in range(45):
+            s.Remove()
+        self.assertEqual(len(s), 6)
+        self.assertEqual(s[0,1], 1)
+        s.AddNodes(5)
+        self.assertEqual(list(s.Parents(9)), [])
+        self.assertEqual(list(s.Children(0)), [ 1 ])
+
+test_classes = (MatrixTest, ListTest, CSRTest, MemmapMatrixTest, AutoTest,
+        BitMatrixTest)
 
 def load_tests(loader, standard_tests, unused):
     suite = TestSuite()
@@ -37,6 +37,15 @@ class TreeTest(TestCase):
         self.assertFalse(node.IsRoot())
 
 
+    def test_parent_chain(self):
+        nodes = [ self.root ]
+        for i in range(10):
+            nodes.append(nodes[-1].AddChild(i + 1))
+
+        for parent, child in zip(nodes, nodes[1:]):
+            self.assert_node_eq(child.Parent(), parent)
+            self.assert_node_eq(child.GetRoot(), self.root)
+
 
 test_classes = (TreeTest,)
 
@@ -81,7 +81,7 @@ class TreeNode(TreeNodeInterface):
         return self._CreateNode(self._bundle.rootid)
 
     def Parent(self):
-        parents = self._GraphNode().Parents()
+        parents = self._GraphNode().ParentIds()
 
         if len(parents) == 0:
             return None
@@ -0,0 +1,56 @@
+import numpy as np
+
+# Disjoint sets over the ids 0..N-1 with path compression and union by
+# rank. parent and rank are flat lists indexed by id, which are faster
+# than NumPy arrays for one element at a time.
+
+
+class UnionFind(object):
+    def __init__(self, N):
+        if not isinstance(N, int) or N < 0:
+            raise ValueError("Invalid set count: %s" % N)
+        self.parent = list(range(N))
+        self.rank = [ 0 ] * N
+        self.sets = N
+
+    def Add(self, k=1):
+        # New singleton sets; returns the id of the first
+        start = len(self.parent)
+        self.parent.extend(range(start, start + k))
+        self.rank.extend([ 0 ] * k)
+        self.sets += k
+        return start
+
+    def Find(self, x):
+        parent = self.parent
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def Union(self, x, y):
+        # Returns False if x and y were already in the same set
+        x, y = self.Find(x), self.Find(y)
+        if x == y:
+            return False
+        rank = self.rank
+        if rank[x] < rank[y]:
+            x, y = y, x
+        self.parent[y] = x
+        if rank[x] == rank[y]:
+            rank[x] += 1
+        self.sets -= 1
+        return True
+
+    def Connected(self, x, y):
+        return self.Find(x) == self.Find(y)
+
+    def Labels(self):
+        # The root of every id's set, as an array
+        return np.array([ self.Find(x) for x in range(len(self.parent)) ],
+                dtype=np.int64)
+
+    def __len__(self):
+        return len(self.parent)